@@ -0,0 +1,217 @@
+"""
+Agent Worker
+
+Request handler run inside each WorkerPool process. A worker owns one crypto
+analysis MCP client and one binance-futures MCP client per Binance account it
+serves, all on its own event loop, so nothing is shared between processes.
+
+Accounts are configured in mcp_config.json under an optional "accounts" key that
+maps an account name to the environment overrides for the binance-futures server:
+
+    "accounts": {
+        "main": {"BINANCE_API_KEY": "...", "BINANCE_SECRET_KEY": "..."}
+    }
+
+The "default" account uses the binance-futures server configuration unchanged.
+"""
+
+import os
+import time
+import asyncio
+import traceback
+from typing import Any, Dict, Optional
+
+from mcp import StdioServerParameters
+
+from crypto_trading_agent import get_market_state, agent_loop, run_batch, SupervisedMCPClient, BATCH_CONCURRENCY
+from worker_pool import route_worker
+from risk_engine import RiskEngine
+from completion_cache import CompletionCache
+
+# Constants
+DEFAULT_ACCOUNT = "default"
+
+
+def build_server_params(server_config: dict, env_overrides: Optional[Dict[str, str]] = None) -> StdioServerParameters:
+    """
+    Build StdioServerParameters for an MCP server entry, applying per-account environment overrides.
+
+    docker run only forwards variables passed with -e, so overrides are also written
+    into the docker arguments.
+    """
+    args = list(server_config["args"])
+    env = dict(server_config.get("env") or {})
+
+    if env_overrides:
+        env.update(env_overrides)
+        for key, value in env_overrides.items():
+            replaced = False
+            for i in range(1, len(args)):
+                if args[i - 1] == "-e" and args[i].split("=", 1)[0] == key:
+                    args[i] = f"{key}={value}"
+                    replaced = True
+            if not replaced and server_config["command"] == "docker" and "run" in args:
+                insert_at = args.index("run") + 1
+                args[insert_at:insert_at] = ["-e", f"{key}={value}"]
+
+    return StdioServerParameters(
+        command=server_config["command"],
+        args=args,
+        cwd=server_config["cwd"],
+        env=env,
+    )
+
+
+class AgentWorker:
+    """
+    WorkerPool handler that runs agent_loop against this worker's own MCP clients.
+    """
+    def __init__(self, index: int, config: dict, num_workers: int = 1):
+        """Initialize the worker with its index, the loaded MCP configuration and the pool size"""
+        self.index = index
+        self.config = config
+        self.num_workers = num_workers
+        self.crypto_client = None
+        self.crypto_tools = {}
+        self.accounts = {}  # Account name -> {"client", "tools", "risk_engine"}
+        self._account_lock = asyncio.Lock()
+        self.completion_cache = CompletionCache()
+        self.batch_completion_cache = CompletionCache()  # Batches see only read-only tools, so their answers are kept apart
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+
+    async def start(self):
+        """Connect the crypto client, and the default account if requests for it are routed here"""
+        servers = self.config.get("mcpServers", {})
+        if "crypto" in servers:
+            self.crypto_client = SupervisedMCPClient(build_server_params(servers["crypto"]), "crypto")
+            await self.crypto_client.connect()
+            self.crypto_tools = await self.crypto_client.get_available_tools()
+
+        # Other workers connect an account only when a request for it arrives
+        if "binance-futures" in servers and route_worker(DEFAULT_ACCOUNT, self.num_workers) == self.index:
+            await self._account(DEFAULT_ACCOUNT)
+
+        print(f"Worker {self.index} (pid {os.getpid()}) ready")
+
+    async def _account(self, name: str) -> Dict[str, Any]:
+        """Return the clients for an account, connecting them on first use"""
+        async with self._account_lock:
+            if name in self.accounts:
+                return self.accounts[name]
+
+            servers = self.config.get("mcpServers", {})
+            if "binance-futures" not in servers:
+                raise RuntimeError("No binance-futures MCP server configured")
+
+            overrides = self.config.get("accounts", {}).get(name)
+            if overrides is None and name != DEFAULT_ACCOUNT:
+                raise ValueError(f"Unknown account: {name}")
+
+            client = SupervisedMCPClient(build_server_params(servers["binance-futures"], overrides), "binance-futures")
+            await client.connect()
+            tools = await client.get_available_tools()
+            self.accounts[name] = {"client": client, "tools": tools, "risk_engine": RiskEngine()}
+            print(f"Worker {self.index} connected account {name} with {len(tools)} tools")
+            return self.accounts[name]
+
+    async def handle(self, payload: dict) -> Dict[str, Any]:
+        """
+        Process one prompt for an account.
+
+        Args:
+            payload: Dictionary with "prompt" and optional "account"
+
+        Returns:
+            Dictionary with the response text, the market state it used, timing and worker index
+        """
+        self.requests += 1
+        self.in_flight += 1
+        start_time = time.time()
+        try:
+            account = await self._account(payload.get("account") or DEFAULT_ACCOUNT)
+            market_state = await get_market_state(self.crypto_client, account["client"])
+            response, _ = await agent_loop(
+                payload["prompt"],
+                self.crypto_tools,
+                account["tools"],
+                market_state,
+                risk_engine=account["risk_engine"],
+                completion_cache=self.completion_cache
+            )
+            if hasattr(response, 'content'):
+                response = response.content
+            return {
+                "response": response,
+                "market_state": market_state,
+                "processing_time": time.time() - start_time,
+                "worker": self.index,
+            }
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def stream(self, payload: dict):
+        """
+        Process a batch of prompts for an account, yielding results as they finish.
+
+        Args:
+            payload: Dictionary with "prompts" and optional "account" and "concurrency"
+        """
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            account = await self._account(payload.get("account") or DEFAULT_ACCOUNT)
+            market_state = await get_market_state(self.crypto_client, account["client"])
+            async for result in run_batch(
+                payload["prompts"],
+                self.crypto_tools,
+                account["tools"],
+                market_state,
+                concurrency=payload.get("concurrency", BATCH_CONCURRENCY),
+                completion_cache=self.batch_completion_cache
+            ):
+                if result.get("done"):
+                    result["worker"] = self.index
+                yield result
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def status(self) -> Dict[str, Any]:
+        """
+        Report this worker's connection status and request counters.
+
+        binance_connected is None while the worker has no account connected.
+        """
+        return {
+            "worker": self.index,
+            "pid": os.getpid(),
+            "crypto_connected": self.crypto_client is not None and self.crypto_client.connected,
+            "binance_connected": all(a["client"].connected for a in self.accounts.values()) if self.accounts else None,
+            "crypto_tools_count": len(self.crypto_tools),
+            "binance_tools_count": max((len(a["tools"]) for a in self.accounts.values()), default=0),
+            "accounts": sorted(self.accounts),
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "completion_cache": self.completion_cache.stats(),
+            "batch_completion_cache": self.batch_completion_cache.stats(),
+        }
+
+    async def stop(self):
+        """Close every MCP client owned by this worker"""
+        clients = [a["client"] for a in self.accounts.values()]
+        if self.crypto_client is not None:
+            clients.append(self.crypto_client)
+        for client in clients:
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception as e:
+                print(f"Error closing {client.server_name} client in worker {self.index}: {str(e)}")
+                traceback.print_exc()
@@ -1,25 +1,34 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 import asyncio
 import json
 import os
 import time
 import sys
 import platform
+import queue
 from dotenv import load_dotenv
 from openai import OpenAI
 import json
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
 # Import from the crypto trading agent
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from crypto_trading_agent import (
     get_market_state,
     agent_loop,
-    MCPClient,
+    run_batch,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_CONCURRENCY,
+    SupervisedMCPClient,
     MODEL_ID as LLM_MODEL
 )
+from status_publisher import StatusPublisher
+from risk_engine import RiskEngine
+from completion_cache import CompletionCache
+from worker_pool import WorkerPool, WORKER_COUNT, WORKER_REQUEST_TIMEOUT
+from agent_worker import AgentWorker, DEFAULT_ACCOUNT
 
 load_dotenv()
 
@@ -35,6 +44,12 @@ client = None
 market_state = {}
 loop = None
 executor = ThreadPoolExecutor(max_workers=2)
+publisher = StatusPublisher()
+risk_engine = RiskEngine()
+completion_cache = CompletionCache()
+batch_completion_cache = CompletionCache()  # Batches see only read-only tools, so their answers are kept apart
+pool = None  # WorkerPool when running with WORKERS > 1
+BATCH_MAX_PROMPTS = 200
 
 @app.route('/')
 def index():
@@ -57,17 +72,25 @@ def handle_prompt():
         # Process the user instruction in a thread-safe way
         start_time = time.time()
         
+        if pool is not None:
+            return handle_prompt_in_pool(data, user_input, start_time)
+        
         # First refresh market state
         market_state = run_async(get_market_state(crypto_client, binance_client))
+        publisher.update(market_state=market_state)
         
         # Create a temporary copy of the state and tools for the agent
         async def process():
-            return await agent_loop(user_input, crypto_tools, binance_tools, market_state)
+            return await agent_loop(
+                user_input, crypto_tools, binance_tools, market_state,
+                risk_engine=risk_engine, completion_cache=completion_cache
+            )
             
         # Run the agent loop in the event loop
         result = run_async(process())
         
         processing_time = time.time() - start_time
+        publisher.record_latency("prompt", processing_time)
         
         # agent_loop returns a tuple of (response_text, messages)
         # We only want to return the first element (response_text)
@@ -90,21 +113,152 @@ def handle_prompt():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/status')
-def get_status():
+def handle_prompt_in_pool(data, user_input, start_time):
+    """Route a prompt to the worker process that owns its account"""
+    global market_state
+    # Route by account only, so each account has one binance client and one risk engine
+    account = data.get('account') or DEFAULT_ACCOUNT
+    future = pool.submit(account, {"prompt": user_input, "account": account})
+    try:
+        result = future.result(timeout=WORKER_REQUEST_TIMEOUT)
+    except FuturesTimeoutError:
+        return jsonify({"error": f"No reply from worker within {WORKER_REQUEST_TIMEOUT:.0f} seconds"}), 504
+    
+    # The dashboard shows the default account only
+    if account == DEFAULT_ACCOUNT:
+        market_state = result["market_state"]
+        publisher.update(market_state=market_state)
+    
+    processing_time = time.time() - start_time
+    publisher.record_latency("prompt", processing_time)
+    
+    return jsonify({
+        "response": result["response"],
+        "processing_time": f"{processing_time:.2f}",
+        "worker": result["worker"]
+    })
+
+def iterate_async(async_gen):
+    """Iterate an async generator running on the background loop from sync code"""
+    items = queue.Queue()
+    done = object()
+    
+    async def pump():
+        try:
+            async for item in async_gen:
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+    
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stops outstanding prompts if the client disconnects
+        future.cancel()
+
+@app.route('/api/batch', methods=['POST'])
+def handle_batch():
+    """Run many prompts concurrently and stream one JSON line per result as each finishes"""
+    global market_state
+    data = request.json or {}
+    prompts = data.get('prompts')
+    
+    if not isinstance(prompts, list) or not prompts or not all(isinstance(p, str) and p.strip() for p in prompts):
+        return jsonify({"error": "prompts must be a non-empty list of strings"}), 400
+    if len(prompts) > BATCH_MAX_PROMPTS:
+        return jsonify({"error": f"At most {BATCH_MAX_PROMPTS} prompts per batch"}), 400
+    
     try:
-        status = {
-            "crypto_connected": crypto_client is not None and crypto_client.session is not None,
-            "binance_connected": binance_client is not None and binance_client.session is not None,
+        concurrency = int(data.get('concurrency', BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency must be an integer"}), 400
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+    
+    if pool is not None:
+        # Batches only read the account, so they are spread over every worker rather than pinned to its owner
+        account = data.get('account') or DEFAULT_ACCOUNT
+        results = pool.stream(None, {"prompts": prompts, "account": account, "concurrency": concurrency})
+    else:
+        # One market-state snapshot shared by every prompt in the batch
+        market_state = run_async(get_market_state(crypto_client, binance_client))
+        publisher.update(market_state=market_state)
+        results = iterate_async(run_batch(
+            prompts, crypto_tools, binance_tools, market_state,
+            concurrency=concurrency, completion_cache=batch_completion_cache
+        ))
+    
+    def generate():
+        try:
+            for result in results:
+                if "processing_time" in result:
+                    publisher.record_latency("batch_prompt", result["processing_time"])
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            print(f"Error processing batch: {str(e)}")
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def collect_status():
+    """Build the connection status dictionary shared by /api/status and /api/stream"""
+    if pool is not None:
+        # Aggregate over workers: a service counts as connected only if every worker using it is
+        workers = pool.status()
+        binance_workers = [w for w in workers if w.get("binance_connected") is not None]
+        return {
+            "crypto_connected": all(w.get("crypto_connected") for w in workers),
+            "binance_connected": bool(binance_workers) and all(w["binance_connected"] for w in binance_workers),
             "openai_connected": client is not None,
-            "crypto_tools_count": len(crypto_tools) if crypto_tools else 0,
-            "binance_tools_count": len(binance_tools) if binance_tools else 0,
-            "llm_model": LLM_MODEL
+            "crypto_tools_count": min(w.get("crypto_tools_count", 0) for w in workers),
+            "binance_tools_count": max((w.get("binance_tools_count", 0) for w in binance_workers), default=0),
+            "llm_model": LLM_MODEL,
+            "workers": workers
+        }
+    return {
+        "crypto_connected": crypto_client is not None and crypto_client.connected,
+        "binance_connected": binance_client is not None and binance_client.connected,
+        "openai_connected": client is not None,
+        "crypto_tools_count": len(crypto_tools) if crypto_tools else 0,
+        "binance_tools_count": len(binance_tools) if binance_tools else 0,
+        "llm_model": LLM_MODEL,
+        "completion_cache": completion_cache.stats(),
+        "batch_completion_cache": batch_completion_cache.stats(),
+        "mcp_health": {
+            c.server_name: c.health() for c in (crypto_client, binance_client) if isinstance(c, SupervisedMCPClient)
         }
-        return jsonify(status)
+    }
+
+@app.route('/api/status')
+def get_status():
+    try:
+        return jsonify(collect_status())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/stream')
+def stream_status():
+    """Server-Sent Events channel pushing status, latency and market-state snapshots"""
+    return Response(
+        publisher.stream(),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def refresh_market_state():
+    """Refresh the shared market state for the status publisher"""
+    global market_state
+    market_state = await get_market_state(crypto_client, binance_client)
+    return market_state
+
 async def load_mcp_config():
     """Load the MCP server configuration from mcp_config.json"""
     config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_config.json")
@@ -131,7 +285,7 @@ async def initialize_clients():
             cwd=config["mcpServers"]["crypto"]["cwd"],
             env=config["mcpServers"]["crypto"].get("env", {})
         )
-        crypto_client = MCPClient(crypto_server_params, "crypto")
+        crypto_client = SupervisedMCPClient(crypto_server_params, "crypto")
         await crypto_client.connect()
         print("Connected to crypto MCP server")
         crypto_tools = await crypto_client.get_available_tools()
@@ -144,7 +298,7 @@ async def initialize_clients():
             cwd=config["mcpServers"]["binance-futures"]["cwd"],
             env=config["mcpServers"]["binance-futures"].get("env", {})
         )
-        binance_client = MCPClient(binance_server_params, "binance-futures")
+        binance_client = SupervisedMCPClient(binance_server_params, "binance-futures")
         await binance_client.connect()
         print("Connected to binance-futures MCP server")
         binance_tools = await binance_client.get_available_tools()
@@ -155,6 +309,7 @@ async def initialize_clients():
 
     # Get initial market state
     market_state = await get_market_state(crypto_client, binance_client)
+    publisher.update(market_state=market_state)
     
     print("\n✅ Initialization complete")
     print(f"Loaded {len(crypto_tools)} tools from crypto server and {len(binance_tools)} tools from binance server")
@@ -174,9 +329,22 @@ if __name__ == '__main__':
     t.daemon = True
     t.start()
     
-    # Initialize clients in the background loop
-    future = asyncio.run_coroutine_threadsafe(initialize_clients(), loop)
-    future.result()  # Wait for initialization to complete
+    if WORKER_COUNT > 1:
+        # Each worker process owns its own MCP clients; this process only routes requests
+        config = run_async(load_mcp_config())
+        pool = WorkerPool(AgentWorker, WORKER_COUNT, handler_args=(config, WORKER_COUNT))
+        pool.start()
+        import atexit
+        atexit.register(pool.stop)
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        publisher.start(loop, collect_status)
+    else:
+        # Initialize clients in the background loop
+        future = asyncio.run_coroutine_threadsafe(initialize_clients(), loop)
+        future.result()  # Wait for initialization to complete
+        
+        # Start pushing status and market updates to connected browsers
+        publisher.start(loop, collect_status, refresh_market_state if binance_client else None)
     
     # Run Flask app in the main thread
-    app.run(debug=True, port=5000, use_reloader=False)
+    app.run(debug=True, port=5000, use_reloader=False, threaded=True)
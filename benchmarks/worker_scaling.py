@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Worker Scaling Benchmark
+
+Measures WorkerPool throughput for an increasing number of worker processes using
+stub handlers instead of real MCP servers and LLM calls. Each stub request does the
+CPU-bound part of an agent turn (serializing tool results and market state, building
+the prompt, parsing the response) plus an optional simulated network wait.
+
+Requests are routed the way app.py routes them: prompts by account, so --accounts
+bounds how many workers can be busy, and batches (--route batch) round-robin.
+
+Usage:
+    python benchmarks/worker_scaling.py --requests 400 --work-ms 20 --accounts 1
+    python benchmarks/worker_scaling.py --requests 400 --work-ms 20 --route batch
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from worker_pool import WorkerPool
+
+# Constants
+DEFAULT_ACCOUNT = "default"  # Same route key as agent_worker.DEFAULT_ACCOUNT
+
+
+class StubAgentWorker:
+    """
+    WorkerPool handler that stands in for AgentWorker without any external servers.
+    """
+    def __init__(self, index: int, work_ms: float, wait_ms: float):
+        """Initialize the stub with the CPU time and simulated wait per request"""
+        self.index = index
+        self.work_ms = work_ms
+        self.wait_ms = wait_ms
+        self.requests = 0
+        self.market_state = {}
+
+    async def start(self):
+        """Build a synthetic market state, as a real worker would after connecting"""
+        rng = random.Random(self.index)
+        self.market_state = {
+            "positions": {
+                f"SYM{i}USDT": {"contracts": rng.random(), "markPrice": rng.random() * 1000, "unrealizedPnl": rng.random()}
+                for i in range(20)
+            },
+            "orders": {},
+        }
+
+    async def handle(self, payload: dict) -> dict:
+        """Burn work_ms of CPU the way an agent turn does, then wait wait_ms"""
+        self.requests += 1
+        start_time = time.perf_counter()
+        digest = b""
+        # Measure CPU time, not wall time, so oversubscribed cores do not look like scaling
+        deadline = time.process_time() + self.work_ms / 1000
+        while time.process_time() < deadline:
+            prompt = json.dumps({"query": payload["prompt"], "state": self.market_state})
+            digest = hashlib.sha256(json.loads(prompt)["query"].encode() + digest).digest()
+        if self.wait_ms:
+            await asyncio.sleep(self.wait_ms / 1000)
+        return {"response": digest.hex()[:16], "worker": self.index,
+                "processing_time": time.perf_counter() - start_time}
+
+    async def status(self) -> dict:
+        """Report request counters"""
+        return {"worker": self.index, "pid": os.getpid(), "requests": self.requests}
+
+    async def stop(self):
+        """Nothing to close"""
+
+
+def route_keys(num_requests: int, num_accounts: int, route: str) -> list:
+    """Return the route key of each request: its account for prompts, None for batches"""
+    if route == "batch":
+        return [None] * num_requests
+    accounts = [DEFAULT_ACCOUNT] + [f"account-{i}" for i in range(1, num_accounts)]
+    return [accounts[i % num_accounts] for i in range(num_requests)]
+
+
+def run_benchmark(num_workers: int, num_requests: int, work_ms: float, wait_ms: float,
+                  num_accounts: int = 1, route: str = "account") -> float:
+    """
+    Run num_requests stub requests through a pool of num_workers processes.
+
+    Returns:
+        Throughput in requests per second (pool start-up excluded)
+    """
+    pool = WorkerPool(StubAgentWorker, num_workers, handler_args=(work_ms, wait_ms))
+    pool.start()
+    try:
+        start_time = time.perf_counter()
+        futures = [pool.submit(key, {"prompt": f"Analyze pair {i}"})
+                   for i, key in enumerate(route_keys(num_requests, num_accounts, route))]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start_time
+    finally:
+        pool.stop()
+    return num_requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WorkerPool scaling with stub workers")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per run")
+    parser.add_argument("--work-ms", type=float, default=20, help="CPU time per request in milliseconds")
+    parser.add_argument("--wait-ms", type=float, default=0, help="Simulated network wait per request in milliseconds")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="Largest pool size to test")
+    parser.add_argument("--accounts", type=int, default=1, help="Accounts the requests are spread over")
+    parser.add_argument("--route", choices=("account", "batch"), default="account",
+                        help="Route by account like /api/prompt, or round-robin like /api/batch")
+    args = parser.parse_args()
+    args.accounts = max(1, args.accounts)
+
+    worker_counts = sorted({1, *[n for n in (2, 4, 8, 16, 32) if n <= args.max_workers], args.max_workers})
+
+    routing = "round-robin" if args.route == "batch" else f"routed by {args.accounts} account(s)"
+    print(f"{args.requests} requests, {args.work_ms} ms CPU + {args.wait_ms} ms wait each, {routing}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>9} {'efficiency':>11}")
+    baseline = None
+    for num_workers in worker_counts:
+        throughput = run_benchmark(num_workers, args.requests, args.work_ms, args.wait_ms, args.accounts, args.route)
+        baseline = baseline or throughput
+        speedup = throughput / baseline
+        print(f"{num_workers:>8} {throughput:>10.1f} {speedup:>8.2f}x {speedup / num_workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Completion Cache
+
+Caches agent responses for analysis-only turns so an operator repeating the same
+question within minutes does not pay for the full LLM-plus-tools pipeline again.
+
+Entries are keyed on the normalized query and the market-state snapshot version
+(a digest of the stable fields of open positions and orders, so mark-price and PnL
+ticks do not invalidate it), and remember a digest of the tool results
+the answer was built from. A lookup can hit at two points:
+
+1. Before anything runs, on (query, snapshot version): the whole turn is skipped.
+   Only for analysis queries, so a trade instruction always reaches the model.
+2. After the tools ran, if their results match the cached digest: the final LLM
+   call is skipped.
+
+Entries expire after a fraction of the candle timeframe mentioned in the query or
+tool arguments (a 1h analysis stays valid longer than a 1m one). Turns that called
+a mutating tool are never cached. Memory is bounded by LRU eviction.
+
+ToolResultCache is the short-lived counterpart used by batch runs: it shares the
+results of identical read-only tool calls between all prompts of one batch.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from risk_engine import classify_tool, TOOL_READ_ONLY
+
+# Constants
+COMPLETION_CACHE_SIZE = int(os.getenv("COMPLETION_CACHE_SIZE", "256"))  # Max cached turns
+COMPLETION_CACHE_TTL_FRACTION = 0.25  # Fraction of a candle an answer stays valid
+COMPLETION_CACHE_DEFAULT_TTL = 60  # Seconds, when no timeframe is mentioned
+COMPLETION_CACHE_MIN_TTL = 30
+COMPLETION_CACHE_MAX_TTL = 3600
+
+TIMEFRAME_PATTERN = re.compile(r"\b(\d+)\s*-?\s*(m|min|minute|h|hr|hour|d|day|w|week)s?\b", re.IGNORECASE)
+TIMEFRAME_UNITS = {"m": 60, "min": 60, "minute": 60, "h": 3600, "hr": 3600, "hour": 3600,
+                   "d": 86400, "day": 86400, "w": 604800, "week": 604800}
+TIMEFRAME_ARGUMENT_KEYS = ("timeframe", "interval", "period")
+TRADE_INSTRUCTION_PATTERN = re.compile(
+    r"\b(buy|sell|long|short|place|open|close|cancel|exit|enter|set|move|take|reduce|add|hedge|flip|leverage|order|stop)\b",
+    re.IGNORECASE
+)
+POSITION_VERSION_FIELDS = ("symbol", "side", "contracts", "entryPrice")
+ORDER_VERSION_FIELDS = ("id", "status", "amount")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and strip trailing punctuation"""
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _stable_fields(entries: Any, fields: Tuple[str, ...]) -> Any:
+    """Keep only the given fields of each position or order; errors are kept whole"""
+    if not isinstance(entries, dict):
+        return entries
+    return {
+        key: {field: entry.get(field) for field in fields} if isinstance(entry, dict) else entry
+        for key, entry in entries.items()
+    }
+
+
+def market_state_version(market_state: dict) -> str:
+    """Digest of open positions and orders; changes when a position or order changes, not on price ticks"""
+    return _digest([
+        _stable_fields(market_state.get("positions", {}), POSITION_VERSION_FIELDS),
+        _stable_fields(market_state.get("orders", {}), ORDER_VERSION_FIELDS),
+    ])
+
+
+def is_mutating_tool(tool_name: str, binance_tools: dict) -> bool:
+    """Return True for Binance Futures tools that can change account state"""
+    return tool_name in binance_tools and classify_tool(tool_name) != TOOL_READ_ONLY
+
+
+def is_analysis_query(query: str) -> bool:
+    """Return True if the query mentions nothing that could be a trade instruction"""
+    return not TRADE_INSTRUCTION_PATTERN.search(query)
+
+
+def timeframe_ttl(query: str, tool_arguments: Iterable[dict] = ()) -> float:
+    """
+    Pick a TTL from the shortest candle timeframe in the query or tool arguments.
+
+    Returns:
+        TTL in seconds
+    """
+    texts = [query]
+    for arguments in tool_arguments:
+        texts.extend(str(arguments[key]) for key in TIMEFRAME_ARGUMENT_KEYS if key in arguments)
+
+    candle_seconds = [
+        int(amount) * TIMEFRAME_UNITS[unit.lower()]
+        for text in texts
+        for amount, unit in TIMEFRAME_PATTERN.findall(text)
+    ]
+    if not candle_seconds:
+        return COMPLETION_CACHE_DEFAULT_TTL
+    ttl = min(candle_seconds) * COMPLETION_CACHE_TTL_FRACTION
+    return max(COMPLETION_CACHE_MIN_TTL, min(COMPLETION_CACHE_MAX_TTL, ttl))
+
+
+class CompletionCache:
+    """
+    LRU cache of analysis-only agent turns with per-entry TTLs and hit-rate metrics.
+    """
+    def __init__(self, max_entries: int = COMPLETION_CACHE_SIZE):
+        """Initialize an empty cache holding at most max_entries turns"""
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.completion_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, query: str, version: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        key = _digest([normalize_query(query), version])
+        entry = self._entries.get(key)
+        if entry is not None and entry["expires_at"] <= time.time():
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return key, entry
+
+    def get(self, query: str, version: str) -> Optional[str]:
+        """
+        Return the cached response for a whole turn, or None on a miss.
+        """
+        _, entry = self._lookup(query, version)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["response"]
+
+    def get_completion(self, query: str, version: str, tool_results: List[Any]) -> Optional[str]:
+        """
+        Return the cached final response if the tools returned exactly the cached results.
+        """
+        _, entry = self._lookup(query, version)
+        if entry is None or entry["tool_digest"] != _digest(tool_results):
+            return None
+        self.completion_hits += 1
+        return entry["response"]
+
+    def put(self, query: str, version: str, tool_results: List[Any], response: str, ttl: float):
+        """Store a turn's response, evicting the least recently used entries when full"""
+        key = _digest([normalize_query(query), version])
+        self._entries[key] = {
+            "response": response,
+            "tool_digest": _digest(tool_results),
+            "expires_at": time.time() + ttl,
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for status reporting"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "completion_hits": self.completion_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class ToolResultCache:
+    """
+    Shares read-only tool results between concurrent agent turns, e.g. the prompts of one batch.
+
+    Identical calls (same tool, same arguments) share one result for the lifetime of the
+    cache, and calls that overlap in time await the same in-flight request. Error results
+    are not kept, so a later call can retry.
+    """
+    def __init__(self):
+        """Initialize an empty cache"""
+        self._results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def wrap(self, tools: dict, binance_tools: dict) -> dict:
+        """
+        Return a copy of a tools dictionary whose read-only tools go through this cache.
+
+        Args:
+            tools: Tools dictionary to wrap
+            binance_tools: Binance Futures tools, used to recognize mutating tools
+        """
+        wrapped = {}
+        for name, tool in tools.items():
+            if is_mutating_tool(name, binance_tools):
+                wrapped[name] = tool
+            else:
+                wrapped[name] = dict(tool, callable=self._cached_callable(tool["name"], tool["callable"]))
+        return wrapped
+
+    def _cached_callable(self, tool_name: str, func):
+        async def callable(*args, **kwargs):
+            key = _digest([tool_name, args, kwargs])
+            future = self._results.get(key)
+            if future is None:
+                self.misses += 1
+                future = self._results[key] = asyncio.ensure_future(func(*args, **kwargs))
+            else:
+                self.hits += 1
+
+            try:
+                result = await asyncio.shield(future)
+            except Exception:
+                self._results.pop(key, None)
+                raise
+            if isinstance(result, dict) and "error" in result:
+                self._results.pop(key, None)
+            return result
+
+        return callable
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for the batch summary"""
+        calls = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / calls, 3) if calls else 0.0,
+        }
@@ -14,6 +14,7 @@ import platform
 import time
 import argparse
 import traceback
+import contextlib
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from dotenv import load_dotenv
@@ -38,11 +39,28 @@ client = AsyncOpenAI(
 # Constants
 MODEL_ID = os.getenv("LLM_MODEL", "gpt-4o")  # Use environment variable with fallback
 INITIALIZATION_TIMEOUT = 30  # 30 seconds timeout for server initialization
+MCP_PROBE_INTERVAL = float(os.getenv("MCP_PROBE_INTERVAL", "5"))  # Seconds between health pings
+MCP_PROBE_TIMEOUT = float(os.getenv("MCP_PROBE_TIMEOUT", "3"))  # Seconds before a ping counts as failed
+MCP_RECONNECT_BACKOFF = 0.5  # Initial delay between reconnect attempts, doubled after each failure
+MCP_RECONNECT_MAX_BACKOFF = 30
+MCP_RECOVERY_WAIT = 10  # Seconds a tool call waits for an in-progress recovery
+MCP_WARM_STANDBY = os.getenv("MCP_WARM_STANDBY", "false").lower() == "true"  # Keep a pre-initialized spare session
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # Prompts of a batch processed at the same time
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))  # Upper bound for requested concurrency
+FALLBACK_RESPONSE_PREFIX = "I apologize, but I'm having trouble connecting to my reasoning services."
 
 # MCP imports
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+# Local pre-trade risk checks
+from risk_engine import RiskEngine, classify_tool, tool_failed, TOOL_STOP, TOOL_TAKE_PROFIT
+
+# Response cache for analysis-only turns
+from completion_cache import (
+    CompletionCache, ToolResultCache, market_state_version, is_mutating_tool, is_analysis_query, timeframe_ttl
+)
+
 # System prompt for the trading agent
 SYSTEM_PROMPT = """You are a crypto trading assistant that analyzes markets and helps execute trades on Binance Futures.
 
@@ -62,7 +80,7 @@ Pending orders:
 Please analyze the market data carefully before suggesting any trades. If the user asks you to place a trade:
 1. Always check current market conditions using the crypto analysis tools
 2. Look at technical indicators, support/resistance levels, and market sentiment
-3. Consider risk management - never risk more than 2% of the account on a single trade
+3. Consider risk management - never risk more than 2% of the account on a single trade. Every new order needs a stop-loss that is actually placed: send a stop-loss order for the same symbol in the same set of tool calls. Orders, stops and leverage changes are validated by a local risk engine, which may resize or reject them and reports the computed sizing in the tool result
 4. Provide a clear explanation of your trading rationale
 5. Execute trades precisely as described
 
@@ -82,6 +100,21 @@ class MCPClient:
         self._client = None
         self.tools = {}  # Will store available tools
 
+    @property
+    def connected(self) -> bool:
+        """Whether the client currently has a usable session"""
+        return self.session is not None
+
+    def _report_failure(self, error: str):
+        """Hook called when a tool call fails at the transport level; overridden by SupervisedMCPClient"""
+
+    async def _ensure_ready(self):
+        """Hook awaited before every tool call; overridden by SupervisedMCPClient"""
+
+    async def _await_tool_task(self, tool_task: asyncio.Task):
+        """Wait for a tool call to finish; overridden by SupervisedMCPClient"""
+        return await asyncio.wait_for(tool_task, timeout=INITIALIZATION_TIMEOUT)
+
     async def __aenter__(self):
         """Async context manager entry"""
         await self.connect()
@@ -197,6 +230,8 @@ class MCPClient:
 
         async def callable(*args, **kwargs):
             try:
+                await self._ensure_ready()
+                
                 # Parameter mapping from OpenAI format to expected server format
                 mapped_kwargs = kwargs.copy()
                 
@@ -214,7 +249,7 @@ class MCPClient:
                 # Use timeout for tool calls to avoid hanging
                 tool_task = asyncio.create_task(self.session.call_tool(tool_name, arguments=mapped_kwargs))
                 try:
-                    response = await asyncio.wait_for(tool_task, timeout=INITIALIZATION_TIMEOUT)
+                    response = await self._await_tool_task(tool_task)
                     print(f"DEBUG: Got response from tool {tool_name}")
                     
                     # Extract the text content from the response
@@ -234,25 +269,251 @@ class MCPClient:
                         return result
                 except asyncio.TimeoutError:
                     print(f"ERROR: Timeout calling tool {tool_name} after {INITIALIZATION_TIMEOUT} seconds")
+                    self._report_failure(f"Timeout calling tool {tool_name}")
                     return {"error": f"Operation timed out after {INITIALIZATION_TIMEOUT} seconds"}
             except Exception as e:
                 print(f"Error calling {tool_name}: {str(e)}")
                 traceback.print_exc()  # Print the full traceback
+                self._report_failure(str(e))
                 return {"error": str(e)}
 
         return callable
 
 
+class SupervisedMCPClient(MCPClient):
+    """
+    An MCPClient that health-checks its server and reconnects automatically.
+
+    Every connection is owned by a dedicated task, so its stdio transport is opened and
+    closed in the same task and a dying server process cannot take other tasks down.
+    The supervisor pings the server every MCP_PROBE_INTERVAL seconds, and immediately when
+    the connection task ends or a tool call fails. If the ping fails it swaps in the warm
+    standby session when one is ready, otherwise it reconnects with exponential backoff.
+    Tool callables read self.session at call time, so they pick up the new session as-is.
+    """
+    def __init__(self, server_params: StdioServerParameters, server_name: str, standby: bool = MCP_WARM_STANDBY):
+        """Initialize the supervised client; standby keeps a pre-initialized spare session"""
+        super().__init__(server_params, server_name)
+        self.standby_enabled = standby
+        self.healthy = False
+        self.restarts = 0
+        self.last_failure = None
+        self.last_recovery_ms = None
+        self._active = None  # Connection dict: {"client", "close", "task"}
+        self._standby = None
+        self._standby_task = None
+        self._supervisor_task = None
+        self._failure_event = asyncio.Event()
+        self._ready_event = asyncio.Event()
+
+    @property
+    def connected(self) -> bool:
+        """Whether the session exists and passed its last health probe"""
+        return self.session is not None and self.healthy
+
+    def health(self) -> Dict[str, Any]:
+        """Summarize supervision state for status reporting"""
+        return {
+            "healthy": self.healthy,
+            "restarts": self.restarts,
+            "last_failure": self.last_failure,
+            "last_recovery_ms": self.last_recovery_ms,
+            "standby_ready": self._standby is not None,
+        }
+
+    async def connect(self):
+        """Open the primary connection and start supervising it"""
+        self._adopt(await self._open())
+        self._supervisor_task = asyncio.create_task(self._supervise())
+        self._start_standby()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Stop supervision and close the active and standby connections"""
+        for task in (self._supervisor_task, self._standby_task):
+            if task is not None:
+                task.cancel()
+        for connection in (self._standby, self._active):
+            if connection is not None:
+                await self._close(connection)
+        self._standby = self._active = self.session = None
+        self.healthy = False
+
+    async def _open(self) -> Dict[str, Any]:
+        """Start a connection task and wait until its session is initialized"""
+        client = MCPClient(self.server_params, self.server_name)
+        ready = asyncio.get_running_loop().create_future()
+        close_event = asyncio.Event()
+
+        async def run():
+            try:
+                async with client:
+                    ready.set_result(client)
+                    await close_event.wait()
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+                else:
+                    print(f"Connection to {self.server_name} MCP server ended: {str(e)}")
+
+        task = asyncio.create_task(run())
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), timeout=INITIALIZATION_TIMEOUT * 2)
+        except BaseException:
+            close_event.set()
+            task.cancel()
+            raise
+        return {"client": client, "close": close_event, "task": task}
+
+    async def _close(self, connection: Dict[str, Any]):
+        """Ask a connection task to exit its transport, cancelling it if it does not finish"""
+        connection["close"].set()
+        try:
+            await asyncio.wait_for(connection["task"], timeout=5)
+        except BaseException:
+            connection["task"].cancel()
+
+    def _adopt(self, connection: Dict[str, Any]):
+        """Make a connection the active one"""
+        client = connection["client"]
+        self._active = connection
+        self.session = client.session
+        self.read, self.write = client.read, client.write
+        self._client = client._client
+        self.healthy = True
+        self._ready_event.set()
+
+    async def _probe(self, connection: Dict[str, Any]) -> bool:
+        """Ping a connection, returning False if its task ended or the ping fails or times out"""
+        if connection["task"].done():
+            return False
+        try:
+            await asyncio.wait_for(connection["client"].session.send_ping(), timeout=MCP_PROBE_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    def _start_standby(self):
+        """Prepare a spare initialized session in the background"""
+        if not self.standby_enabled or self._standby is not None:
+            return
+        if self._standby_task is not None and not self._standby_task.done():
+            return
+
+        async def prepare():
+            try:
+                self._standby = await self._open()
+                print(f"Warm standby ready for {self.server_name} MCP server")
+            except Exception as e:
+                print(f"Error preparing standby for {self.server_name} MCP server: {str(e)}")
+
+        self._standby_task = asyncio.create_task(prepare())
+
+    def _report_failure(self, error: str):
+        """Wake the supervisor so a failed tool call is checked without waiting for the next probe"""
+        self.last_failure = error
+        self._failure_event.set()
+
+    async def _ensure_ready(self):
+        """Hold tool calls briefly while a recovery is in progress"""
+        if not self.healthy:
+            try:
+                await asyncio.wait_for(self._ready_event.wait(), timeout=MCP_RECOVERY_WAIT)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _await_tool_task(self, tool_task: asyncio.Task):
+        """
+        Wait for a tool call, failing fast if its connection ends first.
+
+        Calls are not retried on the new session: an order may already have reached the exchange.
+        """
+        connection_task = self._active["task"]
+        done, _ = await asyncio.wait(
+            {tool_task, connection_task},
+            timeout=INITIALIZATION_TIMEOUT,
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        if tool_task in done:
+            return tool_task.result()
+        tool_task.cancel()
+        if connection_task in done:
+            raise ConnectionError(f"Connection to {self.server_name} MCP server was lost during the call")
+        raise asyncio.TimeoutError()
+
+    async def _supervise(self):
+        """Probe the active connection and recover it when it stops responding"""
+        while True:
+            try:
+                failure_wait = asyncio.create_task(self._failure_event.wait())
+                await asyncio.wait(
+                    {failure_wait, self._active["task"]},
+                    timeout=MCP_PROBE_INTERVAL,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                failure_wait.cancel()
+                tool_failed = self._failure_event.is_set()
+                self._failure_event.clear()
+
+                if await self._probe(self._active):
+                    self.healthy = True
+                    continue
+
+                if self._active["task"].done():
+                    self.last_failure = "Server process exited"
+                elif not tool_failed:
+                    self.last_failure = "Health probe failed"
+                await self._recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error supervising {self.server_name} MCP server: {str(e)}")
+                traceback.print_exc()
+                await asyncio.sleep(MCP_PROBE_INTERVAL)
+
+    async def _recover(self):
+        """Replace the active connection with the standby or a fresh one"""
+        self.healthy = False
+        self._ready_event.clear()
+        start_time = time.time()
+        print(f"WARNING: {self.server_name} MCP server is unresponsive ({self.last_failure}), recovering...")
+
+        old = self._active
+        new = None
+        if self._standby is not None:
+            candidate, self._standby = self._standby, None
+            if await self._probe(candidate):
+                new = candidate
+            else:
+                asyncio.create_task(self._close(candidate))
+
+        backoff = MCP_RECONNECT_BACKOFF
+        while new is None:
+            try:
+                new = await self._open()
+            except Exception as e:
+                print(f"Reconnect to {self.server_name} MCP server failed: {str(e)}; retrying in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MCP_RECONNECT_MAX_BACKOFF)
+
+        self._adopt(new)
+        asyncio.create_task(self._close(old))
+        self.restarts += 1
+        self.last_recovery_ms = round((time.time() - start_time) * 1000, 1)
+        print(f"Recovered {self.server_name} MCP server in {self.last_recovery_ms} ms")
+        self._start_standby()
+
+
 async def get_market_state(crypto_client, binance_client):
     """
     Get current market state including positions and orders.
     
     Returns:
-        Dictionary containing positions and orders
+        Dictionary containing positions, orders and the time the fetch started
     """
     state = {
         "positions": {},
-        "orders": {}
+        "orders": {},
+        "updated_at": time.time()
     }
     
     try:
@@ -289,7 +550,8 @@ async def get_market_state(crypto_client, binance_client):
     return state
 
 
-async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market_state: dict, messages: List[dict] = None):
+async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market_state: dict, messages: List[dict] = None,
+                     risk_engine: Optional[RiskEngine] = None, completion_cache: Optional[CompletionCache] = None):
     """
     Main interaction loop that processes user queries using the LLM and available tools.
 
@@ -299,7 +561,12 @@ async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market
         binance_tools: Dictionary of available Binance Futures tools
         market_state: Current market state (positions, orders)
         messages: List of previous messages, defaults to None
+        risk_engine: Optional risk engine that validates order-placing tool calls
+        completion_cache: Optional cache of analysis-only turns; only used for new conversations
     """
+    # Cached answers depend only on the query, so skip the cache when continuing a conversation
+    use_cache = completion_cache is not None and messages is None
+    
     # Combine tools from both MCP servers
     all_tools = {}
     all_tools.update(crypto_tools)
@@ -329,6 +596,19 @@ async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market
     # Add user query to messages
     messages.append({"role": "user", "content": query})
     
+    # Serve repeated analysis questions without calling the LLM or any tools
+    if use_cache:
+        state_version = market_state_version(market_state)
+        cached_response = completion_cache.get(query, state_version) if is_analysis_query(query) else None
+        if cached_response is not None:
+            print("Serving response from completion cache")
+            messages.append({"role": "assistant", "content": cached_response})
+            return cached_response, messages
+    
+    # Track exposure from the market state already fetched; equity is fetched only when an order needs it
+    if risk_engine is not None:
+        risk_engine.update_market_state(market_state)
+    
     try:
         # First response from LLM
         print("Sending request to LLM...")
@@ -349,24 +629,64 @@ async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market
         if stop_reason == "tool_calls":
             # Add the assistant's tool calls to messages
             messages.append(first_response.choices[0].message)
+            first_tool_message = len(messages)
             
-            # Process each tool call
+            # Parse arguments
+            tool_calls = []
             for tool_call in first_response.choices[0].message.tool_calls:
-                function_name = tool_call.function.name
-                
-                # Parse arguments
                 try:
                     arguments = json.loads(tool_call.function.arguments)
                 except json.JSONDecodeError:
                     arguments = {}
+                tool_calls.append((tool_call, tool_call.function.name, arguments))
+            tool_arguments = [arguments for _, _, arguments in tool_calls]
+            
+            # Validate every Binance call that is not read-only locally before it reaches the exchange,
+            # then place stop and take-profit orders after the orders they protect
+            risk_checks = [None] * len(tool_calls)
+            if risk_engine is not None:
+                risk_checks = await risk_engine.check_tool_calls(
+                    [(name, arguments) for _, name, arguments in tool_calls],
+                    binance_tools,
+                    {**binance_tools, **crypto_tools}
+                )
+                checked_calls = sorted(
+                    zip(tool_calls, risk_checks),
+                    key=lambda item: classify_tool(item[0][1], item[0][2]) in (TOOL_STOP, TOOL_TAKE_PROFIT)
+                )
+            else:
+                checked_calls = list(zip(tool_calls, risk_checks))
+            checked_symbols = set()
+            
+            # Process each tool call
+            for (tool_call, function_name, arguments), risk_check in checked_calls:
+                if is_mutating_tool(function_name, binance_tools):
+                    use_cache = False
                 
                 print(f"Executing tool: {function_name}")
                 
+                if risk_check is not None:
+                    print(f"Risk check for {function_name}: {risk_check['action']} - {risk_check['reason']}")
+                    if risk_check["action"] == "reject":
+                        messages.append({
+                            "role": "tool",
+                            "tool_call_id": tool_call.id,
+                            "name": function_name,
+                            "content": json.dumps({"error": f"Order rejected by risk engine: {risk_check['reason']}", "risk_check": risk_check}),
+                        })
+                        continue
+                    arguments = risk_check["arguments"]
+                
                 # Execute the tool if it exists
                 if function_name in all_tools:
                     try:
                         tool_result = await all_tools[function_name]["callable"](**arguments)
                         
+                        if risk_check is not None:
+                            risk_engine.complete(risk_check, not tool_failed(tool_result))
+                            checked_symbols.add(risk_check["sizing"].get("symbol"))
+                            tool_result = {"result": tool_result, "risk_check": risk_check}
+                        
                         # Add tool result to messages
                         messages.append({
                             "role": "tool",
@@ -375,6 +695,8 @@ async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market
                             "content": json.dumps(tool_result),
                         })
                     except Exception as e:
+                        if risk_check is not None:
+                            risk_engine.complete(risk_check, False)
                         error_msg = f"Error executing {function_name}: {str(e)}"
                         messages.append({
                             "role": "tool",
@@ -391,20 +713,44 @@ async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market
                         "content": json.dumps({"error": f"Tool {function_name} not found"}),
                     })
             
-            # Get final response after tool execution
-            new_response = await client.chat.completions.create(
-                model=MODEL_ID,
-                messages=messages,
-            )
+            # Reuse the cached answer if the tools returned exactly what it was built from
+            tool_results = [(m["name"], m["content"]) for m in messages[first_tool_message:]]
+            
+            # Never cache an answer built from failed tool calls
+            if any(tool_failed(json.loads(content)) for _, content in tool_results):
+                use_cache = False
+            
+            unprotected = sorted(s for s in checked_symbols if s and risk_engine.is_unprotected(s))
+            if unprotected:
+                messages.append({
+                    "role": "system",
+                    "content": f"WARNING: no stop-loss order is in place for the {', '.join(unprotected)} position. "
+                               "Tell the user prominently and ask them to place one.",
+                })
+            response_text = completion_cache.get_completion(query, state_version, tool_results) if use_cache else None
+            
+            if response_text is None:
+                # Get final response after tool execution
+                new_response = await client.chat.completions.create(
+                    model=MODEL_ID,
+                    messages=messages,
+                )
+                response_text = new_response.choices[0].message.content
+                
+                if use_cache and response_text:
+                    completion_cache.put(query, state_version, tool_results, response_text, timeframe_ttl(query, tool_arguments))
             
             # Add assistant's response to messages
-            messages.append({"role": "assistant", "content": new_response.choices[0].message.content})
-            return new_response.choices[0].message.content, messages
+            messages.append({"role": "assistant", "content": response_text})
+            return response_text, messages
         
         elif stop_reason == "stop":
             # If no tools were called, use the first response
-            messages.append({"role": "assistant", "content": first_response.choices[0].message.content})
-            return first_response.choices[0].message.content, messages
+            response_text = first_response.choices[0].message.content
+            if use_cache and response_text:
+                completion_cache.put(query, state_version, [], response_text, timeframe_ttl(query))
+            messages.append({"role": "assistant", "content": response_text})
+            return response_text, messages
         
         else:
             raise ValueError(f"Unknown stop reason: {stop_reason}")
@@ -415,7 +761,7 @@ async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market
         traceback.print_exc()
         
         # Generate a fallback response without using OpenAI
-        fallback_response = "I apologize, but I'm having trouble connecting to my reasoning services. Here's what I can do based on my available tools:\n\n"
+        fallback_response = f"{FALLBACK_RESPONSE_PREFIX} Here's what I can do based on my available tools:\n\n"
         
         # List available tools from both servers
         fallback_response += "From crypto analysis server:\n"
@@ -434,9 +780,125 @@ async def agent_loop(query: str, crypto_tools: dict, binance_tools: dict, market
         return fallback_response, messages
 
 
-async def main():
+def is_fallback_response(response: Any) -> bool:
+    """Return True if agent_loop answered with its fallback text because the LLM call failed"""
+    return isinstance(response, str) and response.startswith(FALLBACK_RESPONSE_PREFIX)
+
+
+async def run_batch(prompts: List[str], crypto_tools: dict, binance_tools: dict, market_state: dict,
+                    concurrency: int = BATCH_CONCURRENCY, completion_cache: Optional[CompletionCache] = None):
+    """
+    Run many analysis prompts through agent_loop concurrently, yielding each result as soon as it finishes.
+
+    Batches are analysis-only: mutating Binance Futures tools are not offered to the model,
+    so a sweep cannot place orders. All prompts share the same market-state snapshot and
+    one ToolResultCache, so identical read-only tool calls made by different prompts reach
+    the MCP servers only once.
+
+    Args:
+        prompts: User queries to process
+        crypto_tools: Dictionary of available crypto analysis tools
+        binance_tools: Dictionary of available Binance Futures tools
+        market_state: Market state snapshot shared by every prompt
+        concurrency: Maximum number of prompts processed at the same time, capped at BATCH_MAX_CONCURRENCY
+        completion_cache: Optional cache of analysis-only turns
+
+    Yields:
+        One dictionary per prompt (index, prompt, response and/or error, processing_time),
+        followed by a summary dictionary with "done" set to True. A prompt answered with
+        the fallback text because the LLM failed counts as an error.
+    """
+    start_time = time.time()
+    tool_cache = ToolResultCache()
+    read_only_binance_tools = {
+        name: tool for name, tool in binance_tools.items() if not is_mutating_tool(name, binance_tools)
+    }
+    batch_crypto_tools = tool_cache.wrap(crypto_tools, binance_tools)
+    batch_binance_tools = tool_cache.wrap(read_only_binance_tools, binance_tools)
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, BATCH_MAX_CONCURRENCY)))
+
+    async def run_one(index: int, prompt: str) -> Dict[str, Any]:
+        async with semaphore:
+            prompt_start = time.time()
+            result = {"index": index, "prompt": prompt}
+            try:
+                response, _ = await agent_loop(
+                    prompt,
+                    batch_crypto_tools,
+                    batch_binance_tools,
+                    market_state,
+                    completion_cache=completion_cache
+                )
+                result["response"] = response.content if hasattr(response, 'content') else response
+                if is_fallback_response(result["response"]):
+                    result["error"] = "LLM request failed; the response is the fallback text"
+            except Exception as e:
+                print(f"Error processing batch prompt {index}: {str(e)}")
+                traceback.print_exc()
+                result["error"] = str(e)
+            result["processing_time"] = round(time.time() - prompt_start, 3)
+            return result
+
+    tasks = [asyncio.create_task(run_one(index, prompt)) for index, prompt in enumerate(prompts)]
+    errors = 0
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            errors += "error" in result
+            yield result
+    finally:
+        # Stop outstanding prompts if the consumer goes away
+        for task in tasks:
+            task.cancel()
+
+    yield {
+        "done": True,
+        "count": len(prompts),
+        "errors": errors,
+        "total_time": round(time.time() - start_time, 3),
+        "tool_cache": tool_cache.stats(),
+    }
+
+
+async def run_batch_file(args: argparse.Namespace, crypto_client, binance_client, crypto_tools: dict, binance_tools: dict):
+    """
+    Run the prompts from args.batch (one per line, "-" for stdin) and write JSON lines to args.output.
+
+    Without args.output the results go to the process's real stdout; main is run with
+    stdout redirected to stderr in batch mode, so progress and debug output stay off it.
+    """
+    if args.batch == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(args.batch, "r") as f:
+            lines = f.read().splitlines()
+    prompts = [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+    print(f"Running {len(prompts)} prompts with concurrency {args.concurrency}...")
+
+    market_state = await get_market_state(crypto_client, binance_client)
+    output = open(args.output, "w") if args.output else sys.__stdout__
+    try:
+        async for result in run_batch(
+            prompts,
+            crypto_tools,
+            binance_tools,
+            market_state,
+            concurrency=args.concurrency,
+            completion_cache=CompletionCache()
+        ):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.__stdout__:
+            output.close()
+
+
+async def main(args: Optional[argparse.Namespace] = None):
     """
     Main function that sets up the MCP servers and runs the interactive trading agent.
+
+    If args.batch is set, runs the prompts from that file concurrently instead and
+    writes one JSON line per result.
     """
     start_time = time.time()  # Track execution time
     
@@ -482,8 +944,8 @@ async def main():
     try:
         print("DEBUG: Starting MCP clients...")
         # Start both MCP clients
-        async with MCPClient(crypto_params, "crypto") as crypto_client, \
-                  MCPClient(binance_params, "binance-futures") as binance_client:
+        async with SupervisedMCPClient(crypto_params, "crypto") as crypto_client, \
+                  SupervisedMCPClient(binance_params, "binance-futures") as binance_client:
             
             # Get available tools from both servers
             print("DEBUG: Getting crypto tools...")
@@ -527,8 +989,14 @@ async def main():
                 print(f"⚠️ WARNING: Could not connect to OpenAI API: {str(e)}")
                 print("Some functionality may be limited. Direct tool calls will still work.")
             
+            # Batch mode: run every prompt from the file and exit
+            if args is not None and args.batch:
+                await run_batch_file(args, crypto_client, binance_client, crypto_tools, binance_tools)
+                return
+            
             # Interactive loop
             messages = None
+            risk_engine = RiskEngine()
             while True:
                 try:
                     # Get user input
@@ -575,7 +1043,8 @@ async def main():
                         crypto_tools, 
                         binance_tools, 
                         market_state, 
-                        messages
+                        messages,
+                        risk_engine
                     )
                     
                     # Print the response
@@ -594,4 +1063,14 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Crypto Trading Agent")
+    parser.add_argument("--batch", help="Run the prompts in this file (one per line, '-' for stdin) instead of the interactive loop")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Prompts processed at the same time in batch mode")
+    parser.add_argument("--output", help="Write batch results to this file instead of stdout")
+    args = parser.parse_args()
+    if args.batch:
+        # Batch results are NDJSON; keep every other print off stdout so it can be parsed
+        with contextlib.redirect_stdout(sys.stderr):
+            asyncio.run(main(args))
+    else:
+        asyncio.run(main(args))
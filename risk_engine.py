@@ -0,0 +1,640 @@
+"""
+Pre-trade Risk Engine
+
+Validates every Binance Futures tool call that is not read-only locally before it
+reaches the MCP server. Account equity and reference prices are fetched only when a
+round of tool calls contains a new order, and cached with a short TTL; open exposure
+per symbol is derived from the market state the agent already fetched, so checking
+an order needs no extra LLM round-trips.
+
+Tool calls are classified from the tool name and order type, and anything not
+recognized as read-only is checked (fail closed):
+
+- Leverage changes must stay within RISK_MAX_LEVERAGE.
+- Stop-loss and take-profit orders must be reduce-only or close an existing position;
+  larger quantities are clamped to what they can close.
+- Cancels and position closes are allowed.
+- Everything else is treated as an order that may open a position. It is sized so
+  that the loss between entry and stop never exceeds RISK_PER_TRADE_PCT of equity,
+  and so that the total notional per symbol (positions, open orders and orders
+  approved but not yet reflected in the market state) stays under
+  RISK_MAX_SYMBOL_EXPOSURE_PCT of equity. The stop must actually be placed: a
+  matching stop order has to pass the checks in the same round of tool calls, or
+  the order is not sent.
+
+Approved orders reserve their notional inside the check, so concurrent turns sharing
+one engine cannot both pass the exposure cap. Orders that cannot be sized are
+rejected, and the computed sizing is always returned to the model as data.
+"""
+
+import os
+import re
+import math
+import time
+import itertools
+import threading
+import traceback
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Constants
+RISK_PER_TRADE_PCT = float(os.getenv("RISK_PER_TRADE_PCT", "2"))  # Max % of equity lost if the stop is hit
+RISK_MAX_LEVERAGE = float(os.getenv("RISK_MAX_LEVERAGE", "20"))
+RISK_DEFAULT_LEVERAGE = float(os.getenv("RISK_DEFAULT_LEVERAGE", "1"))
+RISK_MAX_SYMBOL_EXPOSURE_PCT = float(os.getenv("RISK_MAX_SYMBOL_EXPOSURE_PCT", "300"))  # Notional cap per symbol
+EQUITY_CACHE_TTL = 30  # Seconds before cached account equity is refreshed
+PRICE_CACHE_TTL = 10  # Seconds before a cached reference price is refreshed
+
+# Argument names used by the different order tools for the same field
+QUANTITY_KEYS = ("amount", "quantity", "qty")
+PRICE_KEYS = ("price",)
+STOP_KEYS = ("stop_loss", "stopLoss", "stop_loss_price", "stopLossPrice", "sl")
+TRIGGER_KEYS = ("stopPrice", "stop_price", "triggerPrice", "trigger_price")
+LEVERAGE_KEYS = ("leverage",)
+REDUCE_KEYS = ("reduceOnly", "reduce_only", "closePosition", "close_position")
+ORDER_TYPE_KEYS = ("type", "order_type", "orderType")
+
+# Tool categories
+TOOL_READ_ONLY = "read_only"
+TOOL_LEVERAGE = "leverage"
+TOOL_CANCEL = "cancel"
+TOOL_CLOSE = "close"
+TOOL_STOP = "stop"
+TOOL_TAKE_PROFIT = "take_profit"
+TOOL_ORDER = "order"
+
+READ_ONLY_TOOL_PATTERN = re.compile(r"(^|_)(get|fetch|list)[-_]")
+CANCEL_TOOL_PATTERN = re.compile(r"(^|[-_])cancel[-_]")
+CLOSE_TOOL_PATTERN = re.compile(r"(^|[-_])close[-_]")
+LEVERAGE_TOOL_PATTERN = re.compile(r"leverage")
+TAKE_PROFIT_PATTERN = re.compile(r"take[-_ ]?profit")
+STOP_PATTERN = re.compile(r"stop")
+TRAILING_PATTERN = re.compile(r"trailing")
+PRICE_TOOL_PATTERN = re.compile(r"ticker|mark[-_]?price|[-_]price")
+
+
+def classify_tool(tool_name: str, arguments: Optional[dict] = None) -> str:
+    """
+    Classify a Binance Futures tool call for risk checking.
+
+    Unrecognized tools are classified as TOOL_ORDER so they are checked as new orders.
+    """
+    name = tool_name.lower()
+    if READ_ONLY_TOOL_PATTERN.search(name):
+        return TOOL_READ_ONLY
+    if CANCEL_TOOL_PATTERN.search(name):
+        return TOOL_CANCEL
+    if CLOSE_TOOL_PATTERN.search(name):
+        return TOOL_CLOSE
+    if LEVERAGE_TOOL_PATTERN.search(name):
+        return TOOL_LEVERAGE
+
+    order_type = ""
+    if isinstance(arguments, dict):
+        order_type = str(next((arguments[k] for k in ORDER_TYPE_KEYS if k in arguments), "")).lower()
+    text = f"{name} {order_type}"
+    if TAKE_PROFIT_PATTERN.search(text):
+        return TOOL_TAKE_PROFIT
+    if STOP_PATTERN.search(text):
+        return TOOL_STOP
+    return TOOL_ORDER
+
+
+def tool_failed(result: Any) -> bool:
+    """Return True if a tool result reports an error"""
+    if isinstance(result, dict):
+        return "error" in result
+    return isinstance(result, str) and result.strip().lower().startswith("error")
+
+
+def normalize_symbol(symbol: str) -> str:
+    """Normalize BTC/USDT, BTC/USDT:USDT and BTCUSDT to BTCUSDT"""
+    return str(symbol).upper().split(":")[0].replace("/", "").replace("-", "")
+
+
+def size_positions(equity: float, entries: Sequence[float], stops: Sequence[float],
+                   leverages: Sequence[float], risk_pct: float = RISK_PER_TRADE_PCT) -> List[Dict[str, float]]:
+    """
+    Compute risk-based position sizes for a batch of candidate orders in one pass.
+
+    Args:
+        equity: Account equity in quote currency
+        entries: Entry prices
+        stops: Stop-loss prices
+        leverages: Leverage for each order
+        risk_pct: Percentage of equity that may be lost if the stop is hit
+
+    Returns:
+        List of dictionaries with quantity, notional, margin and risk_amount for each order
+    """
+    risk_amount = equity * risk_pct / 100
+    sizes = []
+    for entry, stop, leverage in zip(entries, stops, leverages):
+        stop_distance = abs(entry - stop)
+        quantity = risk_amount / stop_distance if stop_distance > 0 else 0.0
+        notional = quantity * entry
+        sizes.append({
+            "quantity": quantity,
+            "notional": notional,
+            "margin": notional / leverage if leverage > 0 else notional,
+            "risk_amount": quantity * stop_distance,
+            "stop_distance_pct": stop_distance / entry * 100 if entry > 0 else 0.0,
+        })
+    return sizes
+
+
+def _floor_quantity(quantity: float, significant_digits: int = 4) -> float:
+    """Round a quantity down so resizing never exceeds the computed limit"""
+    if quantity <= 0:
+        return 0.0
+    decimals = max(0, significant_digits - int(math.floor(math.log10(quantity))) - 1)
+    factor = 10 ** decimals
+    return math.floor(quantity * factor) / factor
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Convert a tool argument or result field to float, returning None if not numeric"""
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _extract_equity(balance: Any) -> Optional[float]:
+    """
+    Extract USDT equity from the different balance response shapes.
+    """
+    if isinstance(balance, list):
+        for asset in balance:
+            if isinstance(asset, dict) and str(asset.get("asset", "")).upper() == "USDT":
+                for key in ("marginBalance", "balance", "walletBalance", "crossWalletBalance"):
+                    if _to_float(asset.get(key)) is not None:
+                        return _to_float(asset.get(key))
+        return None
+
+    if not isinstance(balance, dict):
+        return None
+
+    for key in ("totalMarginBalance", "totalWalletBalance", "equity"):
+        if _to_float(balance.get(key)) is not None:
+            return _to_float(balance.get(key))
+
+    # ccxt-style balance: {"total": {"USDT": ...}} or {"USDT": {"total": ...}}
+    if isinstance(balance.get("total"), dict):
+        return _to_float(balance["total"].get("USDT"))
+    if isinstance(balance.get("USDT"), dict):
+        return _to_float(balance["USDT"].get("total"))
+    if isinstance(balance.get("info"), (dict, list)):
+        return _extract_equity(balance["info"])
+    return None
+
+
+def _lookup(arguments: dict, keys: Iterable[str]) -> Any:
+    """Find the first of keys in the arguments or their nested "params" dictionary"""
+    params = arguments.get("params") if isinstance(arguments.get("params"), dict) else {}
+    for source in (arguments, params):
+        for key in keys:
+            if key in source:
+                return source[key]
+    return None
+
+
+def _is_reduce_only(arguments: dict) -> bool:
+    flag = _lookup(arguments, REDUCE_KEYS)
+    return flag is True or str(flag).lower() == "true"
+
+
+def _order_side(arguments: dict) -> Optional[str]:
+    """Return "long" for buy orders, "short" for sell orders, or None"""
+    side = str(arguments.get("side", "")).lower()
+    if side in ("buy", "long"):
+        return "long"
+    if side in ("sell", "short"):
+        return "short"
+    return None
+
+
+def _extract_price(result: Any) -> Optional[float]:
+    """Extract a price from the different ticker and mark-price response shapes"""
+    if isinstance(result, list):
+        result = result[0] if result else None
+    if not isinstance(result, dict):
+        return None
+    for key in ("markPrice", "mark", "last", "lastPrice", "price", "close"):
+        price = _to_float(result.get(key))
+        if price:
+            return price
+    if isinstance(result.get("info"), dict):
+        return _extract_price(result["info"])
+    return None
+
+
+def _decision(action: str, reason: str, arguments: dict, sizing: Optional[dict] = None) -> Dict[str, Any]:
+    return {"action": action, "reason": reason, "sizing": sizing or {}, "arguments": arguments, "reservation": None}
+
+
+class RiskEngine:
+    """
+    Local pre-trade risk checks for Binance Futures tool calls.
+
+    Usage per round of tool calls: check_tool_calls() for the whole round, then
+    complete() with the outcome of each approved call so its reservation is kept
+    or released.
+    """
+    def __init__(self, risk_pct: float = RISK_PER_TRADE_PCT, max_leverage: float = RISK_MAX_LEVERAGE,
+                 max_symbol_exposure_pct: float = RISK_MAX_SYMBOL_EXPOSURE_PCT,
+                 equity_ttl: float = EQUITY_CACHE_TTL, price_ttl: float = PRICE_CACHE_TTL):
+        """Initialize the risk engine with its limits"""
+        self.risk_pct = risk_pct
+        self.max_leverage = max_leverage
+        self.max_symbol_exposure_pct = max_symbol_exposure_pct
+        self.equity_ttl = equity_ttl
+        self.price_ttl = price_ttl
+        self.equity = None
+        self.equity_updated_at = 0.0
+        self.exposure = {}  # Absolute notional per normalized symbol, from the last market state
+        self.positions = {}  # Normalized symbol -> (side, contracts)
+        self.prices = {}  # Normalized symbol -> (reference price, fetched at)
+        self.leverage = {}  # Leverage last set per normalized symbol
+        self.unprotected = set()  # Symbols with a position but no stop order in the last market state
+        self.market_state_at = 0.0
+        self._reservations = {}  # Id -> reserved order, until the market state reflects it
+        self._reservation_ids = itertools.count(1)
+        self._pending_stops = {}  # Symbol -> time an order was filled before its stop order was placed
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def requires_check(tool_name: str, binance_tools: dict) -> bool:
+        """Return True for every Binance Futures tool that is not read-only"""
+        return tool_name in binance_tools and classify_tool(tool_name) != TOOL_READ_ONLY
+
+    async def refresh_equity(self, binance_tools: dict):
+        """Refresh account equity from the balance tool if the cached value is stale"""
+        if self.equity is not None and time.time() - self.equity_updated_at < self.equity_ttl:
+            return
+
+        balance_tool = next((t for name, t in binance_tools.items() if "balance" in name.lower()), None)
+        if not balance_tool:
+            return
+
+        try:
+            equity = _extract_equity(await balance_tool["callable"]())
+            if equity is not None:
+                self.equity = equity
+                self.equity_updated_at = time.time()
+            else:
+                print("WARNING: Could not read account equity from balance tool response")
+        except Exception as e:
+            print(f"Error refreshing account equity: {str(e)}")
+            traceback.print_exc()
+
+    async def refresh_prices(self, tool_calls: Sequence[Tuple[str, dict]], tools: dict):
+        """
+        Fetch reference prices for the symbols of order calls that carry no limit price.
+
+        Args:
+            tool_calls: (tool name, arguments) pairs about to be checked
+            tools: Tools to search for a ticker or mark-price tool, in order of preference
+        """
+        price_tool = next(
+            (t for name, t in tools.items()
+             if classify_tool(name) == TOOL_READ_ONLY and PRICE_TOOL_PATTERN.search(name.lower())),
+            None
+        )
+        if price_tool is None:
+            return
+
+        for tool_name, arguments in tool_calls:
+            if classify_tool(tool_name, arguments) != TOOL_ORDER or _to_float(_lookup(arguments, PRICE_KEYS)):
+                continue
+            symbol = arguments.get("symbol")
+            if not symbol:
+                continue
+            cached = self.prices.get(normalize_symbol(symbol))
+            if cached and time.time() - cached[1] < self.price_ttl:
+                continue
+            try:
+                price = _extract_price(await price_tool["callable"](symbol=symbol))
+                if price:
+                    self.prices[normalize_symbol(symbol)] = (price, time.time())
+            except Exception as e:
+                print(f"Error fetching reference price for {symbol}: {str(e)}")
+
+    def update_market_state(self, market_state: dict):
+        """Rebuild per-symbol exposure, positions and stop coverage from market_state"""
+        positions = market_state.get("positions", {})
+        orders = market_state.get("orders", {})
+        if not isinstance(positions, dict) or "error" in positions:
+            return
+
+        updated_at = market_state.get("updated_at", time.time())
+        exposure = {}
+        sides = {}
+        for symbol, position in positions.items():
+            if not isinstance(position, dict):
+                continue
+            key = normalize_symbol(position.get("symbol", symbol))
+            mark_price = _to_float(position.get("markPrice")) or _to_float(position.get("entryPrice"))
+            contracts = _to_float(position.get("contracts")) or 0.0
+            notional = _to_float(position.get("notional"))
+            if notional is None:
+                notional = abs(contracts) * (mark_price or 0.0)
+            exposure[key] = exposure.get(key, 0.0) + abs(notional)
+            side = str(position.get("side", "")).lower() or ("long" if contracts > 0 else "short")
+            sides[key] = (side, abs(contracts))
+            if mark_price:
+                self.prices[key] = (mark_price, updated_at)
+
+        stopped = set()
+        orders_known = isinstance(orders, dict) and "error" not in orders
+        for order in (orders.values() if orders_known else ()):
+            if not isinstance(order, dict):
+                continue
+            key = normalize_symbol(order.get("symbol", ""))
+            order_type = str(order.get("type", "")).lower()
+            if not TAKE_PROFIT_PATTERN.search(order_type) and (
+                    STOP_PATTERN.search(order_type) or _to_float(_lookup(order, TRIGGER_KEYS))):
+                stopped.add(key)
+            if _is_reduce_only(order) or classify_tool("", order) != TOOL_ORDER:
+                continue
+            # Resting orders that can open a position count towards exposure
+            remaining = _to_float(order.get("remaining")) or _to_float(order.get("amount")) or 0.0
+            exposure[key] = exposure.get(key, 0.0) + abs(remaining * (_to_float(order.get("price")) or 0.0))
+
+        with self._lock:
+            self.exposure = exposure
+            self.positions = sides
+            self.unprotected = set(sides) - stopped if orders_known else set()
+            self.market_state_at = updated_at
+            # Completed reservations and unplaced stops are now reflected in the market state
+            for reservation_id, reservation in list(self._reservations.items()):
+                if reservation["completed_at"] is not None and reservation["completed_at"] <= updated_at:
+                    del self._reservations[reservation_id]
+            self._pending_stops = {k: t for k, t in self._pending_stops.items() if t > updated_at}
+
+    def is_unprotected(self, symbol: str) -> bool:
+        """Return True if a position on symbol has no stop order on the exchange"""
+        key = normalize_symbol(symbol)
+        return key in self.unprotected or key in self._pending_stops
+
+    def _reserved(self, symbol: str) -> Tuple[float, Dict[str, float]]:
+        """Return the reserved notional and reserved quantity per side for a symbol"""
+        notional = 0.0
+        quantities = {"long": 0.0, "short": 0.0}
+        for reservation in self._reservations.values():
+            if reservation["symbol"] == symbol:
+                notional += reservation["notional"]
+                quantities[reservation["side"]] += reservation["quantity"]
+        return notional, quantities
+
+    @staticmethod
+    def _quantity_sizing(quantity: float, entry: float, stop: float, leverage: float) -> Dict[str, float]:
+        """Recompute the quantity-dependent sizing fields for the quantity actually sent"""
+        notional = quantity * entry
+        return {
+            "quantity": quantity,
+            "notional": notional,
+            "margin": notional / leverage if leverage > 0 else notional,
+            "risk_amount": quantity * abs(entry - stop),
+        }
+
+    async def check_tool_calls(self, tool_calls: Sequence[Tuple[str, dict]], binance_tools: dict,
+                               price_tools: Optional[dict] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Validate one round of tool calls.
+
+        Equity and reference prices are refreshed first, but only if the round contains
+        an order that can open a position. Orders are checked before stop and take-profit
+        orders so those can close the quantity just reserved, and an order whose stop
+        order is rejected is rejected as well.
+
+        Args:
+            tool_calls: (tool name, arguments) pairs in the order the model sent them
+            binance_tools: Dictionary of available Binance Futures tools
+            price_tools: Tools to search for a ticker or mark-price tool, in order of preference
+
+        Returns:
+            One decision per call (see check_tool_call), or None for calls that need no check
+        """
+        checked = [i for i, (name, _) in enumerate(tool_calls) if self.requires_check(name, binance_tools)]
+        if any(classify_tool(*tool_calls[i]) == TOOL_ORDER and not _is_reduce_only(tool_calls[i][1]) for i in checked):
+            await self.refresh_equity(binance_tools)
+            await self.refresh_prices([tool_calls[i] for i in checked], price_tools or binance_tools)
+
+        decisions = [None] * len(tool_calls)
+        for i in sorted(checked, key=lambda i: classify_tool(*tool_calls[i]) in (TOOL_STOP, TOOL_TAKE_PROFIT)):
+            siblings = [call for j, call in enumerate(tool_calls) if j != i]
+            decisions[i] = self.check_tool_call(tool_calls[i][0], tool_calls[i][1], siblings)
+        self._require_placed_stops(decisions)
+        return decisions
+
+    def _require_placed_stops(self, decisions: List[Optional[Dict[str, Any]]]):
+        """Reject orders none of whose matching stop orders passed the checks, releasing their reservations"""
+        stops = [d for d in decisions if d is not None and d["category"] == TOOL_STOP]
+        for i, decision in enumerate(decisions):
+            if decision is None or decision["reservation"] is None:
+                continue
+            sizing = decision["sizing"]
+            closing = "short" if sizing["side"] == "long" else "long"
+            matching = [d for d in stops if d["sizing"].get("symbol") == sizing["symbol"] and d["sizing"].get("side") in (closing, None)]
+            if any(d["action"] != "reject" for d in matching):
+                continue
+            with self._lock:
+                self._reservations.pop(decision["reservation"], None)
+            reason = matching[0]["reason"] if matching else "no matching stop order"
+            decisions[i] = dict(
+                _decision("reject", f"Order not sent because its stop order was rejected: {reason}", decision["arguments"], sizing),
+                category=decision["category"], check_us=decision["check_us"]
+            )
+
+    def check_tool_call(self, tool_name: str, arguments: dict,
+                        sibling_calls: Sequence[Tuple[str, dict]] = ()) -> Dict[str, Any]:
+        """
+        Validate a single Binance Futures tool call that is not read-only.
+
+        Prefer check_tool_calls(), which also refreshes equity and prices and makes sure
+        an order's stop order is accepted.
+
+        Args:
+            tool_name: Name of the tool being called
+            arguments: Arguments the model passed to the tool
+            sibling_calls: The other (tool name, arguments) pairs of the same round of tool calls
+
+        Returns:
+            Dictionary with action ("approve", "resize" or "reject"), reason, sizing,
+            the arguments to forward to the tool and the id of the reservation it holds
+        """
+        start_time = time.perf_counter()
+        category = classify_tool(tool_name, arguments)
+        with self._lock:
+            if category == TOOL_LEVERAGE:
+                decision = self._check_leverage(arguments)
+            elif category == TOOL_CANCEL:
+                decision = _decision("approve", "Cancelling orders cannot open a position", arguments)
+            elif category == TOOL_CLOSE:
+                decision = _decision("approve", "Closing positions cannot add risk", arguments)
+            elif category in (TOOL_STOP, TOOL_TAKE_PROFIT):
+                decision = self._check_protective(arguments)
+            else:
+                decision = self._check_order(arguments, sibling_calls)
+        decision["category"] = category
+        decision["check_us"] = round((time.perf_counter() - start_time) * 1e6, 1)
+        return decision
+
+    def complete(self, decision: Dict[str, Any], succeeded: bool):
+        """
+        Record the outcome of an approved tool call.
+
+        A failed order releases its reservation; a filled one keeps it until the market
+        state reflects the order.
+        """
+        sizing = decision.get("sizing") or {}
+        with self._lock:
+            reservation = self._reservations.get(decision.get("reservation"))
+            if reservation is not None:
+                if succeeded:
+                    reservation["completed_at"] = time.time()
+                else:
+                    del self._reservations[decision["reservation"]]
+            if not succeeded:
+                return
+
+            symbol = sizing.get("symbol")
+            if decision.get("category") == TOOL_LEVERAGE and symbol:
+                self.leverage[symbol] = sizing["leverage"]
+            elif decision.get("category") == TOOL_STOP and symbol:
+                self._pending_stops.pop(symbol, None)
+                self.unprotected.discard(symbol)
+            elif reservation is not None:
+                # Protected only once the stop order sent alongside it has been placed
+                self._pending_stops[symbol] = time.time()
+
+    def _check_leverage(self, arguments: dict) -> Dict[str, Any]:
+        leverage = _to_float(_lookup(arguments, LEVERAGE_KEYS))
+        symbol = normalize_symbol(arguments.get("symbol", ""))
+        if leverage is None or leverage <= 0:
+            return _decision("reject", "Leverage changes must specify a positive leverage", arguments)
+        if leverage > self.max_leverage:
+            return _decision("reject", f"Leverage {leverage}x exceeds the {self.max_leverage}x limit", arguments)
+        return _decision("approve", "Leverage within limit", arguments, {"symbol": symbol, "leverage": leverage})
+
+    def _check_protective(self, arguments: dict) -> Dict[str, Any]:
+        symbol = normalize_symbol(arguments.get("symbol", ""))
+        side = _order_side(arguments)
+        if _is_reduce_only(arguments):
+            return _decision("approve", "Reduce-only order", arguments, {"symbol": symbol, "side": side})
+
+        quantity = _to_float(_lookup(arguments, QUANTITY_KEYS))
+        if not symbol or side is None:
+            return _decision("reject", "Stop and take-profit orders must specify a symbol and a side", arguments,
+                             {"symbol": symbol, "side": side})
+
+        # Without reduce-only the order may only close what is open or approved on the other side
+        closing = "long" if side == "short" else "short"
+        position_side, contracts = self.positions.get(symbol, (None, 0.0))
+        closable = (contracts if position_side == closing else 0.0) + self._reserved(symbol)[1][closing]
+        sizing = {"symbol": symbol, "side": side, "closable": closable, "requested_quantity": quantity}
+        if closable <= 0:
+            return _decision("reject", f"Stop and take-profit orders must be reduce-only or close an existing {symbol} position", arguments, sizing)
+        if quantity is not None and quantity <= closable:
+            sizing["quantity"] = quantity
+            return _decision("approve", "Order closes an existing position", arguments, sizing)
+
+        # Clamp to what can be closed, e.g. after the order it protects was resized
+        forwarded = dict(arguments)
+        quantity_key = next((k for k in QUANTITY_KEYS if k in arguments), QUANTITY_KEYS[0])
+        forwarded[quantity_key] = closable
+        sizing["quantity"] = closable
+        return _decision("resize", f"Quantity set to the {closable} {symbol} it can close", forwarded, sizing)
+
+    def _sibling_stop(self, symbol: str, side: str, sibling_calls: Sequence[Tuple[str, dict]]) -> Optional[float]:
+        """Return the trigger price of a stop order in the same round that closes this order"""
+        for tool_name, arguments in sibling_calls:
+            if classify_tool(tool_name, arguments) != TOOL_STOP or TRAILING_PATTERN.search(f"{tool_name} {arguments}".lower()):
+                continue
+            if normalize_symbol(arguments.get("symbol", "")) != symbol or _order_side(arguments) == side:
+                continue
+            trigger = _to_float(_lookup(arguments, TRIGGER_KEYS)) or _to_float(_lookup(arguments, STOP_KEYS))
+            if trigger:
+                return trigger
+        return None
+
+    def _check_order(self, arguments: dict, sibling_calls: Sequence[Tuple[str, dict]]) -> Dict[str, Any]:
+        # Orders that only reduce or close a position cannot add risk
+        if _is_reduce_only(arguments):
+            return _decision("approve", "Reduce-only order", arguments)
+
+        if self.equity is None or self.equity <= 0:
+            return _decision("reject", "Account equity is unknown; fetch the balance before placing new orders", arguments)
+
+        symbol = normalize_symbol(arguments.get("symbol", ""))
+        side = _order_side(arguments)
+        if not symbol or side is None:
+            return _decision("reject", "Order must specify a symbol and a side (buy/sell)", arguments)
+
+        cached_price = self.prices.get(symbol)
+        entry = _to_float(_lookup(arguments, PRICE_KEYS)) or (cached_price[0] if cached_price else None)
+        leverage = _to_float(_lookup(arguments, LEVERAGE_KEYS)) or self.leverage.get(symbol, RISK_DEFAULT_LEVERAGE)
+        requested = _to_float(_lookup(arguments, QUANTITY_KEYS))
+
+        # The stop must actually be placed, as a stop order in the same round
+        stop = _to_float(_lookup(arguments, STOP_KEYS))
+        sibling_stop = self._sibling_stop(symbol, side, sibling_calls)
+        if sibling_stop is None:
+            return _decision("reject", f"New orders need a stop order for {symbol} on the closing side in the same set of "
+                             f"tool calls, so risk can be capped at {self.risk_pct}% of equity", arguments)
+        if stop is not None and ((side == "long" and sibling_stop < stop) or (side == "short" and sibling_stop > stop)):
+            return _decision("reject", f"Stop order at {sibling_stop} is further from entry than the stop-loss {stop} used for sizing", arguments)
+        stop = sibling_stop
+
+        if entry is None:
+            return _decision("reject", f"Could not fetch a reference price for {symbol}; retry shortly", arguments)
+        if (side == "long" and stop >= entry) or (side == "short" and stop <= entry):
+            return _decision("reject", f"Stop-loss {stop} is on the wrong side of entry {entry} for a {side} order", arguments)
+        if leverage > self.max_leverage:
+            return _decision("reject", f"Leverage {leverage}x exceeds the {self.max_leverage}x limit", arguments)
+
+        sizing = size_positions(self.equity, [entry], [stop], [leverage], self.risk_pct)[0]
+
+        # Cap the order so total notional on the symbol, including reservations, stays within the exposure limit
+        current_exposure = self.exposure.get(symbol, 0.0) + self._reserved(symbol)[0]
+        exposure_cap = self.equity * self.max_symbol_exposure_pct / 100 - current_exposure
+        max_quantity = _floor_quantity(min(sizing["quantity"], max(exposure_cap, 0.0) / entry))
+        sizing.update({
+            "symbol": symbol,
+            "side": side,
+            "entry": entry,
+            "stop": stop,
+            "leverage": leverage,
+            "equity": self.equity,
+            "risk_pct": self.risk_pct,
+            "current_exposure": current_exposure,
+            "max_quantity": max_quantity,
+            "requested_quantity": requested,
+        })
+
+        if max_quantity <= 0:
+            return _decision("reject", f"{symbol} exposure {current_exposure:.2f} is already at the limit", arguments, sizing)
+
+        if requested is not None and requested <= max_quantity:
+            action, reason, forwarded = "approve", "Order within risk limits", arguments
+            quantity = requested
+        else:
+            # Resize to the maximum allowed quantity under the same argument name the model used
+            forwarded = dict(arguments)
+            quantity_key = next((k for k in QUANTITY_KEYS if k in arguments), QUANTITY_KEYS[0])
+            forwarded[quantity_key] = max_quantity
+            quantity = max_quantity
+            action = "resize"
+            reason = ("Quantity set from risk limits" if requested is None
+                      else f"Quantity reduced from {requested} to {max_quantity} to respect risk limits")
+        sizing.update(self._quantity_sizing(quantity, entry, stop, leverage))
+
+        reservation_id = next(self._reservation_ids)
+        self._reservations[reservation_id] = {
+            "symbol": symbol, "side": side, "quantity": quantity,
+            "notional": sizing["notional"], "completed_at": None,
+        }
+        decision = _decision(action, reason, forwarded, sizing)
+        decision["reservation"] = reservation_id
+        return decision
+
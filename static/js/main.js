@@ -1,9 +1,14 @@
 // Define chatHistory as a global variable
 let chatHistory;
 
+// Polling interval used only when the live status stream is unavailable
+const STATUS_POLL_INTERVAL = 30000;
+let statusPollTimer = null;
+
 document.addEventListener('DOMContentLoaded', function() {
-    // Check server status immediately
+    // Check server status immediately, then subscribe to live updates
     checkServerStatus();
+    connectStatusStream();
     
     // Form submission handling
     const promptForm = document.getElementById('prompt-form');
@@ -58,9 +63,6 @@ document.addEventListener('DOMContentLoaded', function() {
                 promptInput.focus();
             });
     });
-    
-    // Periodically check server status
-    setInterval(checkServerStatus, 30000);
 });
 
 // Send prompt to backend
@@ -86,20 +88,110 @@ async function checkServerStatus() {
     try {
         const response = await fetch('/api/status');
         const status = await response.json();
-        
-        // Update status indicators
-        updateStatusIndicator('crypto-status', status.crypto_connected);
-        updateStatusIndicator('binance-status', status.binance_connected);
-        updateStatusIndicator('openai-status', status.openai_connected);
-        
-        // Update tool counts
-        document.querySelector('#crypto-tools .tools-count').textContent = status.crypto_tools_count;
-        document.querySelector('#binance-tools .tools-count').textContent = status.binance_tools_count;
+        renderStatus(status);
     } catch (error) {
         console.error('Failed to check server status:', error);
     }
 }
 
+// Subscribe to pushed status and market snapshots, falling back to polling
+function connectStatusStream() {
+    if (!window.EventSource) {
+        startStatusPolling();
+        return;
+    }
+
+    const source = new EventSource('/api/stream');
+
+    source.addEventListener('snapshot', function(event) {
+        stopStatusPolling();
+        const snapshot = JSON.parse(event.data);
+
+        if (snapshot.status) {
+            renderStatus(snapshot.status);
+        }
+        if (snapshot.market_state) {
+            renderPositions(snapshot.market_state.positions);
+        }
+        if (snapshot.latency) {
+            renderLatency(snapshot.latency);
+        }
+    });
+
+    // EventSource reconnects on its own; poll in the meantime so the sidebar stays current
+    source.onerror = function() {
+        startStatusPolling();
+    };
+}
+
+function startStatusPolling() {
+    if (statusPollTimer === null) {
+        statusPollTimer = setInterval(checkServerStatus, STATUS_POLL_INTERVAL);
+    }
+}
+
+function stopStatusPolling() {
+    if (statusPollTimer !== null) {
+        clearInterval(statusPollTimer);
+        statusPollTimer = null;
+    }
+}
+
+// Update status indicators and tool counts
+function renderStatus(status) {
+    updateStatusIndicator('crypto-status', status.crypto_connected);
+    updateStatusIndicator('binance-status', status.binance_connected);
+    updateStatusIndicator('openai-status', status.openai_connected);
+
+    document.querySelector('#crypto-tools .tools-count').textContent = status.crypto_tools_count;
+    document.querySelector('#binance-tools .tools-count').textContent = status.binance_tools_count;
+}
+
+// Render open positions from a market-state snapshot
+function renderPositions(positions) {
+    const container = document.getElementById('positions-list');
+    container.innerHTML = '';
+
+    if (!positions || positions.error) {
+        container.innerHTML = `<div class="positions-empty">${positions && positions.error ? 'Unavailable' : 'No open positions'}</div>`;
+        return;
+    }
+
+    const symbols = Object.keys(positions);
+    if (symbols.length === 0) {
+        container.innerHTML = '<div class="positions-empty">No open positions</div>';
+        return;
+    }
+
+    symbols.forEach(symbol => {
+        const position = positions[symbol];
+        const pnl = parseFloat(position.unrealizedPnl || 0);
+
+        const item = document.createElement('div');
+        item.className = 'position-item';
+
+        const name = document.createElement('span');
+        name.className = 'position-symbol';
+        name.textContent = `${symbol} ${position.side || ''} ${position.contracts || ''}`.trim();
+
+        const pnlSpan = document.createElement('span');
+        pnlSpan.className = 'position-pnl ' + (pnl >= 0 ? 'pnl-positive' : 'pnl-negative');
+        pnlSpan.textContent = pnl.toFixed(2);
+
+        item.appendChild(name);
+        item.appendChild(pnlSpan);
+        container.appendChild(item);
+    });
+}
+
+// Render median response latency
+function renderLatency(latency) {
+    const element = document.querySelector('#latency-stats .tools-count');
+    if (latency.prompt) {
+        element.textContent = `${(latency.prompt.p50_ms / 1000).toFixed(1)}s`;
+    }
+}
+
 // Update status indicator
 function updateStatusIndicator(elementId, isConnected) {
     const statusElement = document.querySelector(`#${elementId} .status-indicator`);
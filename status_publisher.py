@@ -0,0 +1,168 @@
+"""
+Status Publisher
+
+A single server-side publisher that pushes connection status, tool counts,
+latency statistics and market-state snapshots to every connected browser over
+one Server-Sent Events (SSE) channel.
+
+The publisher collects data once per interval, regardless of how many clients
+are connected, and serializes each snapshot exactly once. Subscribers only ever
+see the latest snapshot: a slow client skips intermediate versions instead of
+queueing them, so memory stays bounded and many dashboards cost the same as one.
+"""
+
+import json
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Constants
+STATUS_INTERVAL = 2.0  # Seconds between connection status refreshes
+MARKET_INTERVAL = 15.0  # Seconds between market-state refreshes
+KEEPALIVE_INTERVAL = 15.0  # Seconds between SSE keep-alive comments
+LATENCY_WINDOW = 200  # Number of samples kept per latency series
+
+
+class StatusPublisher:
+    """
+    Coalescing publisher for the web UI's live status channel.
+    """
+    def __init__(self, status_interval: float = STATUS_INTERVAL, market_interval: float = MARKET_INTERVAL,
+                 latency_window: int = LATENCY_WINDOW):
+        """Initialize the publisher with its refresh intervals"""
+        self.status_interval = status_interval
+        self.market_interval = market_interval
+        self.latency_window = latency_window
+        self.version = 0
+        self.subscribers = 0
+        self._snapshot = {}
+        self._payload = None
+        self._latencies = {}
+        self._condition = threading.Condition()
+        self._task = None
+
+    def update(self, **fields):
+        """
+        Merge fields into the current snapshot and notify subscribers.
+
+        Updates that do not change the snapshot are coalesced away, so
+        subscribers are only woken up when there is something new to show.
+        """
+        with self._condition:
+            changed = {k: v for k, v in fields.items() if self._snapshot.get(k) != v}
+            if not changed:
+                return
+            self._snapshot.update(changed)
+            self.version += 1
+            self._payload = json.dumps(
+                {"version": self.version, "updated_at": time.time(), **self._snapshot},
+                default=str
+            )
+            self._condition.notify_all()
+
+    def record_latency(self, name: str, seconds: float):
+        """Record a latency sample (in seconds) for the given series"""
+        with self._condition:
+            samples = self._latencies.get(name)
+            if samples is None:
+                samples = self._latencies[name] = deque(maxlen=self.latency_window)
+            samples.append(seconds)
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the recorded latency samples.
+
+        Returns:
+            Dictionary mapping series name to count, average, p50, p95 and max in milliseconds
+        """
+        with self._condition:
+            series = {name: sorted(samples) for name, samples in self._latencies.items() if samples}
+
+        stats = {}
+        for name, samples in series.items():
+            count = len(samples)
+            stats[name] = {
+                "count": count,
+                "avg_ms": round(sum(samples) / count * 1000, 1),
+                "p50_ms": round(samples[count // 2] * 1000, 1),
+                "p95_ms": round(samples[min(count - 1, int(count * 0.95))] * 1000, 1),
+                "max_ms": round(samples[-1] * 1000, 1),
+            }
+        return stats
+
+    def wait_for_update(self, last_version: int, timeout: float = KEEPALIVE_INTERVAL) -> Tuple[int, Optional[str]]:
+        """
+        Block until a snapshot newer than last_version is available.
+
+        Returns:
+            Tuple of (version, payload); payload is None if the wait timed out
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > last_version, timeout=timeout)
+            if self.version > last_version:
+                return self.version, self._payload
+            return last_version, None
+
+    def stream(self):
+        """
+        Generator producing the SSE byte stream for a single subscriber.
+        """
+        with self._condition:
+            self.subscribers += 1
+        try:
+            # Always start with the current snapshot so new dashboards render immediately
+            last_version = 0
+            while True:
+                last_version, payload = self.wait_for_update(last_version)
+                if payload is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"id: {last_version}\nevent: snapshot\ndata: {payload}\n\n"
+        finally:
+            with self._condition:
+                self.subscribers -= 1
+
+    def start(self, loop: asyncio.AbstractEventLoop, collect_status: Callable[[], Dict[str, Any]],
+              collect_market_state: Optional[Callable[[], Any]] = None):
+        """
+        Start the publishing task on the given event loop.
+
+        Args:
+            loop: Event loop that owns the MCP clients
+            collect_status: Callable returning the connection status dictionary
+            collect_market_state: Coroutine function returning the current market state
+        """
+        async def create_task():
+            self._task = asyncio.create_task(self.run(collect_status, collect_market_state))
+
+        asyncio.run_coroutine_threadsafe(create_task(), loop).result()
+
+    async def run(self, collect_status: Callable[[], Dict[str, Any]],
+                  collect_market_state: Optional[Callable[[], Any]] = None):
+        """
+        Publishing loop: refresh status every status_interval and market state every market_interval.
+        """
+        last_market_refresh = 0.0
+        while True:
+            try:
+                self.update(status=collect_status(), latency=self.latency_stats())
+
+                # Market state costs tool round-trips, so only fetch it while someone is watching
+                now = time.monotonic()
+                if (collect_market_state is not None and self.subscribers > 0
+                        and now - last_market_refresh >= self.market_interval):
+                    last_market_refresh = now
+                    start_time = time.time()
+                    market_state = await collect_market_state()
+                    self.record_latency("market_state", time.time() - start_time)
+                    self.update(market_state=market_state)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error publishing status: {str(e)}")
+                traceback.print_exc()
+
+            await asyncio.sleep(self.status_interval)
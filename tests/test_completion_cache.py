@@ -0,0 +1,31 @@
+from completion_cache import CompletionCache, is_analysis_query, is_mutating_tool, market_state_version
+
+
+def test_trade_instructions_are_not_analysis_queries():
+    assert is_analysis_query("Analyze BTC/USDT on 1h")
+    assert is_analysis_query("Show all my pending orders")
+    assert not is_analysis_query("Buy 1 BTC at market")
+    assert not is_analysis_query("Move my stop-loss on BTC/USDT to breakeven")
+
+
+def test_mutating_tools_follow_risk_engine_classification():
+    tools = {"get_positions": {}, "create_order": {}, "set_leverage": {}}
+    assert not is_mutating_tool("get_positions", tools)
+    assert is_mutating_tool("create_order", tools)
+    assert is_mutating_tool("set_leverage", tools)
+    assert not is_mutating_tool("analyze_market", tools)
+
+
+def test_market_state_version_ignores_price_ticks():
+    state = {"positions": {"BTC/USDT": {"symbol": "BTC/USDT", "contracts": 1, "markPrice": 50000}}, "orders": {}}
+    ticked = {"positions": {"BTC/USDT": {"symbol": "BTC/USDT", "contracts": 1, "markPrice": 50100}}, "orders": {}}
+    resized = {"positions": {"BTC/USDT": {"symbol": "BTC/USDT", "contracts": 2, "markPrice": 50000}}, "orders": {}}
+    assert market_state_version(state) == market_state_version(ticked)
+    assert market_state_version(state) != market_state_version(resized)
+
+
+def test_cached_turn_is_served_for_same_query_and_state():
+    cache = CompletionCache()
+    cache.put("Analyze BTC/USDT on 1h", "v1", [], "Bullish", 60)
+    assert cache.get("analyze btc/usdt on 1h?", "v1") == "Bullish"
+    assert cache.get("Analyze BTC/USDT on 1h", "v2") is None
@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+import pytest
+
+from risk_engine import (
+    RiskEngine, classify_tool,
+    TOOL_READ_ONLY, TOOL_LEVERAGE, TOOL_CANCEL, TOOL_CLOSE, TOOL_STOP, TOOL_TAKE_PROFIT, TOOL_ORDER,
+)
+
+
+def make_tool(result):
+    calls = []
+
+    async def tool(**kwargs):
+        calls.append(kwargs)
+        return result
+
+    return {"callable": tool, "calls": calls}
+
+
+def make_engine(equity=10000.0, prices=None):
+    engine = RiskEngine(risk_pct=2, max_leverage=20, max_symbol_exposure_pct=300)
+    engine.equity = equity
+    engine.equity_updated_at = time.time()
+    for symbol, price in (prices or {}).items():
+        engine.prices[symbol] = (price, time.time())
+    return engine
+
+
+BINANCE_TOOLS = {"create_order": make_tool({}), "get_balance": make_tool({"totalMarginBalance": 10000})}
+
+
+def market_buy(amount=1):
+    return ("create_order", {"symbol": "BTC/USDT", "side": "buy", "type": "market", "amount": amount})
+
+
+def stop_sell(amount=1, stop_price=49000):
+    return ("create_order", {"symbol": "BTC/USDT", "side": "sell", "type": "STOP_MARKET",
+                             "amount": amount, "stopPrice": stop_price})
+
+
+@pytest.mark.parametrize("name, arguments, category", [
+    ("get_positions", None, TOOL_READ_ONLY),
+    ("fetch_ticker", None, TOOL_READ_ONLY),
+    ("set_leverage", None, TOOL_LEVERAGE),
+    ("cancel_order", None, TOOL_CANCEL),
+    ("close_position", None, TOOL_CLOSE),
+    ("create_order", {"type": "STOP_MARKET"}, TOOL_STOP),
+    ("create_order", {"type": "TAKE_PROFIT_MARKET"}, TOOL_TAKE_PROFIT),
+    ("create_order", {"type": "market"}, TOOL_ORDER),
+    ("transfer_funds", None, TOOL_ORDER),
+])
+def test_classify_tool(name, arguments, category):
+    assert classify_tool(name, arguments) == category
+
+
+def test_order_is_resized_to_risk_limit():
+    engine = make_engine(prices={"BTCUSDT": 50000})
+    decisions = asyncio.run(engine.check_tool_calls([market_buy(), stop_sell()], BINANCE_TOOLS))
+
+    order, stop = decisions
+    assert order["action"] == "resize"
+    assert order["arguments"]["amount"] == pytest.approx(0.2)
+    assert order["sizing"]["risk_amount"] == pytest.approx(200)
+    # The sibling stop is clamped to the resized order instead of being rejected
+    assert stop["action"] == "resize"
+    assert stop["arguments"]["amount"] == pytest.approx(0.2)
+
+
+def test_resized_order_stays_protected_after_execution():
+    engine = make_engine(prices={"BTCUSDT": 50000})
+    order, stop = asyncio.run(engine.check_tool_calls([market_buy(), stop_sell()], BINANCE_TOOLS))
+
+    engine.complete(order, True)
+    assert engine.is_unprotected("BTCUSDT")
+    engine.complete(stop, True)
+    assert not engine.is_unprotected("BTCUSDT")
+
+
+def test_order_without_stop_is_rejected():
+    engine = make_engine(prices={"BTCUSDT": 50000})
+    order, = asyncio.run(engine.check_tool_calls([market_buy()], BINANCE_TOOLS))
+
+    assert order["action"] == "reject"
+    assert order["reservation"] is None
+
+
+def test_order_is_rejected_with_its_rejected_stop():
+    engine = make_engine(prices={"BTCUSDT": 50000})
+    # A stop without a side is rejected, so the order it protects must not be sent either
+    bad_stop = ("create_order", {"symbol": "BTC/USDT", "type": "STOP_MARKET", "amount": 1, "stopPrice": 49000})
+    order, stop = asyncio.run(engine.check_tool_calls([market_buy(), bad_stop], BINANCE_TOOLS))
+
+    assert stop["action"] == "reject"
+    assert order["action"] == "reject"
+    assert engine._reservations == {}
+
+
+def test_reservations_count_towards_exposure_until_market_state_reflects_them():
+    engine = make_engine(prices={"BTCUSDT": 50000})
+    engine.max_symbol_exposure_pct = 150  # 15000 notional, 0.3 BTC
+
+    first, _ = asyncio.run(engine.check_tool_calls([market_buy(), stop_sell()], BINANCE_TOOLS))
+    second, _ = asyncio.run(engine.check_tool_calls([market_buy(), stop_sell()], BINANCE_TOOLS))
+    assert first["arguments"]["amount"] == pytest.approx(0.2)
+    assert second["arguments"]["amount"] == pytest.approx(0.1)
+
+    engine.complete(first, True)
+    engine.complete(second, False)
+    assert len(engine._reservations) == 1
+
+    engine.update_market_state({
+        "positions": {"BTC/USDT": {"symbol": "BTC/USDT", "side": "long", "contracts": 0.2, "entryPrice": 50000}},
+        "orders": {},
+        "updated_at": time.time(),
+    })
+    assert engine._reservations == {}
+    assert engine.exposure["BTCUSDT"] == pytest.approx(10000)
+
+
+def test_leverage_is_limited_and_recorded():
+    engine = make_engine()
+    rejected = engine.check_tool_call("set_leverage", {"symbol": "BTC/USDT", "leverage": 50})
+    approved = engine.check_tool_call("set_leverage", {"symbol": "BTC/USDT", "leverage": 5})
+
+    assert rejected["action"] == "reject"
+    engine.complete(approved, True)
+    assert engine.leverage["BTCUSDT"] == 5
+
+
+def test_equity_is_fetched_only_for_new_orders():
+    balance = make_tool({"totalMarginBalance": 10000})
+    tools = {"create_order": make_tool({}), "cancel_order": make_tool({}), "get_balance": balance}
+    engine = RiskEngine()
+    engine.prices["BTCUSDT"] = (50000, time.time())
+
+    asyncio.run(engine.check_tool_calls([("cancel_order", {"id": "1", "symbol": "BTC/USDT"})], tools))
+    assert balance["calls"] == []
+
+    asyncio.run(engine.check_tool_calls([market_buy(), stop_sell()], tools))
+    assert len(balance["calls"]) == 1
+    assert engine.equity == 10000
@@ -0,0 +1,326 @@
+"""
+Worker Pool
+
+Supervisor that spreads requests over a pool of worker processes so throughput
+is not capped at one core. Each worker runs its own event loop and owns its own
+handler (and therefore its own MCP clients); workers share nothing and only
+exchange picklable messages with the supervisor.
+
+Requests are routed by a route key (e.g. the account name) with a stable hash,
+so every request for the same key lands on the same worker and reuses its
+connections. Requests without a route key are spread round-robin.
+
+A monitor thread watches the worker processes. When one dies, the requests it
+was serving fail immediately and the worker is respawned with backoff.
+"""
+
+import os
+import time
+import zlib
+import queue
+import asyncio
+import itertools
+import threading
+import traceback
+import multiprocessing as mp
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+# Constants
+WORKER_COUNT = int(os.getenv("WORKERS", "1"))
+WORKER_START_TIMEOUT = 120  # Seconds to wait for every worker to report ready
+STATUS_TIMEOUT = 5  # Seconds to wait for a worker status reply
+WORKER_REQUEST_TIMEOUT = float(os.getenv("WORKER_REQUEST_TIMEOUT", "300"))  # Seconds to wait for a reply
+WORKER_MONITOR_INTERVAL = 1  # Seconds between worker liveness checks
+WORKER_RESTART_BACKOFF = 1  # Initial delay before respawning a dead worker
+WORKER_RESTART_MAX_BACKOFF = 30
+
+
+def route_worker(route_key: str, num_workers: int) -> int:
+    """
+    Map a route key to a worker index.
+
+    Uses crc32 rather than hash() so the mapping is identical across processes and restarts.
+    """
+    return zlib.crc32(str(route_key).encode("utf-8")) % num_workers
+
+
+def _worker_main(index, handler_factory, handler_args, requests, responses):
+    """Entry point of a worker process"""
+    try:
+        asyncio.run(_worker_loop(index, handler_factory, handler_args, requests, responses))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(index, handler_factory, handler_args, requests, responses):
+    """Start the handler, then serve requests concurrently until told to stop"""
+    handler = handler_factory(index, *handler_args)
+    try:
+        await handler.start()
+    except Exception as e:
+        traceback.print_exc()
+        responses.put((index, None, "error", f"Worker {index} failed to start: {str(e)}"))
+        return
+    responses.put((index, None, "result", "ready"))
+
+    loop = asyncio.get_running_loop()
+    tasks = set()
+
+    async def run_request(request_id, op, payload):
+        try:
+            if op == "status":
+                result = await handler.status()
+            elif op == "stream":
+                async for item in handler.stream(payload):
+                    responses.put((index, request_id, "item", item))
+                result = None
+            else:
+                result = await handler.handle(payload)
+            responses.put((index, request_id, "result", result))
+        except Exception as e:
+            traceback.print_exc()
+            responses.put((index, request_id, "error", str(e)))
+
+    while True:
+        request_id, op, payload = await loop.run_in_executor(None, requests.get)
+        if op == "stop":
+            break
+        task = asyncio.create_task(run_request(request_id, op, payload))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await handler.stop()
+
+
+class WorkerPool:
+    """
+    A pool of worker processes with sticky request routing.
+
+    handler_factory(index, *handler_args) is called inside each worker and must return
+    an object with async start(), handle(payload), status() and stop() methods, and
+    optionally an async generator stream(payload). It must be importable from the
+    worker process (a module-level class or function).
+    """
+    def __init__(self, handler_factory, num_workers: int = WORKER_COUNT, handler_args: tuple = ()):
+        """Initialize the pool; call start() to spawn the workers"""
+        self.handler_factory = handler_factory
+        self.num_workers = max(1, num_workers)
+        self.handler_args = handler_args
+        self.processes = []
+        self._requests = []
+        self._responses = None
+        self._ctx = mp.get_context("spawn")
+        self._pending = {}  # Request id -> (worker index, Future or stream queue)
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._round_robin = itertools.count()
+        self._reader = None
+        self._monitor = None
+        self._stopping = threading.Event()
+        self._restart_backoff = {}
+        self._next_restart = {}
+        self.restarts = 0
+
+    def start(self, timeout: float = WORKER_START_TIMEOUT):
+        """Spawn the worker processes and wait until each reports ready"""
+        self._responses = self._ctx.Queue()
+        self._requests = [None] * self.num_workers
+        self.processes = [None] * self.num_workers
+        for index in range(self.num_workers):
+            self._spawn(index)
+
+        deadline = time.time() + timeout
+        ready = set()
+        while len(ready) < self.num_workers:
+            try:
+                index, _, kind, message = self._responses.get(timeout=1)
+            except queue.Empty:
+                dead = [i for i, process in enumerate(self.processes) if i not in ready and not process.is_alive()]
+                if dead or time.time() > deadline:
+                    self.stop()
+                    reason = f"worker {dead[0]} exited" if dead else f"timed out after {timeout} seconds"
+                    raise RuntimeError(f"Only {len(ready)} of {self.num_workers} workers started: {reason}")
+                continue
+            if kind == "error":
+                self.stop()
+                raise RuntimeError(message)
+            ready.add(index)
+
+        self._reader = threading.Thread(target=self._read_responses, name="worker-pool-reader", daemon=True)
+        self._reader.start()
+        self._monitor = threading.Thread(target=self._monitor_workers, name="worker-pool-monitor", daemon=True)
+        self._monitor.start()
+        print(f"Started {self.num_workers} worker processes")
+
+    def _spawn(self, index: int, failure: Optional[str] = None):
+        """
+        Start the process for a worker slot with a fresh request queue.
+
+        When replacing a dead worker, pass failure to fail the requests sent to the old
+        queue; the swap and the failure happen under one lock so no request is lost.
+        """
+        requests = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.handler_factory, self.handler_args, requests, self._responses),
+            name=f"agent-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        with self._pending_lock:
+            self._requests[index] = requests
+            self.processes[index] = process
+            failed = self._pop_pending(index) if failure else []
+        self._fail(failed, failure)
+
+    def _pop_pending(self, index: int) -> list:
+        request_ids = [request_id for request_id, (owner, _) in self._pending.items() if owner == index]
+        return [self._pending.pop(request_id)[1] for request_id in request_ids]
+
+    def _fail(self, failed: list, reason: str):
+        for pending in failed:
+            if isinstance(pending, queue.Queue):
+                pending.put(("error", reason))
+            elif not pending.done():
+                pending.set_exception(RuntimeError(reason))
+
+    def _monitor_workers(self):
+        """Fail the requests of dead workers and respawn them with backoff"""
+        while not self._stopping.wait(WORKER_MONITOR_INTERVAL):
+            for index, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                reason = f"Worker {index} exited with code {process.exitcode}"
+                now = time.time()
+                if now < self._next_restart.get(index, 0) or self._stopping.is_set():
+                    # Not respawning yet: fail whatever was sent to the dead worker meanwhile
+                    with self._pending_lock:
+                        failed = self._pop_pending(index)
+                    self._fail(failed, reason)
+                    continue
+                backoff = self._restart_backoff.get(index, WORKER_RESTART_BACKOFF)
+                self._restart_backoff[index] = min(backoff * 2, WORKER_RESTART_MAX_BACKOFF)
+                self._next_restart[index] = now + backoff
+                print(f"{reason}, restarting")
+                self.restarts += 1
+                self._spawn(index, failure=reason)
+
+    def _read_responses(self):
+        """Resolve pending futures and feed stream queues as worker replies arrive"""
+        while True:
+            try:
+                message = self._responses.get()
+            except (EOFError, OSError, ValueError):
+                break
+            if message is None:
+                break
+            index, request_id, kind, result = message
+            if request_id is None:
+                # Start-up report from a respawned worker
+                if kind == "result":
+                    self._restart_backoff.pop(index, None)
+                    print(f"Worker {index} restarted")
+                else:
+                    print(result)
+                continue
+            with self._pending_lock:
+                if kind == "item":
+                    entry = self._pending.get(request_id)
+                else:
+                    entry = self._pending.pop(request_id, None)
+            if entry is None:
+                continue
+            pending = entry[1]
+            if isinstance(pending, queue.Queue):
+                pending.put((kind, result))
+            elif kind == "result":
+                pending.set_result(result)
+            else:
+                pending.set_exception(RuntimeError(result))
+
+    def _send(self, worker_index: int, op: str, payload: Any, pending=None):
+        pending = pending if pending is not None else Future()
+        request_id = next(self._request_ids)
+        with self._pending_lock:
+            self._pending[request_id] = (worker_index, pending)
+            self._requests[worker_index].put((request_id, op, payload))
+        return pending
+
+    def _route(self, route_key: Optional[str]) -> int:
+        if route_key is None:
+            return next(self._round_robin) % self.num_workers
+        return route_worker(route_key, self.num_workers)
+
+    def submit(self, route_key: Optional[str], payload: Any) -> Future:
+        """
+        Send a request to the worker that owns route_key, or the next worker if it is None.
+
+        Returns:
+            A concurrent.futures.Future resolving to the handler's result
+        """
+        return self._send(self._route(route_key), "handle", payload)
+
+    def stream(self, route_key: Optional[str], payload: Any, timeout: float = WORKER_REQUEST_TIMEOUT):
+        """
+        Send a streaming request to the worker that owns route_key.
+
+        Args:
+            route_key: Key selecting the worker, or None for the next worker round-robin
+            payload: Request payload passed to the handler's stream()
+            timeout: Seconds to wait for each item before giving up
+
+        Yields:
+            Each item produced by the handler's stream(payload), as it arrives
+        """
+        items = self._send(self._route(route_key), "stream", payload, queue.Queue())
+        while True:
+            try:
+                kind, item = items.get(timeout=timeout)
+            except queue.Empty:
+                raise RuntimeError(f"No reply from worker within {timeout} seconds")
+            if kind == "item":
+                yield item
+            elif kind == "error":
+                raise RuntimeError(item)
+            else:
+                return
+
+    def status(self, timeout: float = STATUS_TIMEOUT) -> List[Dict[str, Any]]:
+        """
+        Collect the status of every worker.
+
+        Returns:
+            List with one status dictionary per worker, in worker order
+        """
+        futures = [self._send(index, "status", None) for index in range(self.num_workers)]
+        statuses = []
+        for index, future in enumerate(futures):
+            try:
+                statuses.append(future.result(timeout=timeout))
+            except Exception as e:
+                statuses.append({"worker": index, "error": str(e)})
+            statuses[-1]["alive"] = self.processes[index].is_alive()
+            statuses[-1]["pool_restarts"] = self.restarts
+        return statuses
+
+    def stop(self, timeout: float = 10):
+        """Ask every worker to stop and wait for the processes to exit"""
+        self._stopping.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+        for requests in self._requests:
+            if requests is not None:
+                requests.put((None, "stop", None))
+        for process in self.processes:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._responses is not None:
+            self._responses.put(None)
+        if self._reader is not None:
+            self._reader.join(timeout)